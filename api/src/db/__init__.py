@@ -1,2 +1,3 @@
-from .crud import get_infras, get_infra_detail
+from .crud import (get_infras, stream_infras, get_infra_detail, get_infra_by_key, lookup_infras,
+                   get_stats)
 from .database import get_db_connection
@@ -1,8 +1,25 @@
 import os
+import json
+import itertools
+import logging
+import tempfile
 import threading
-import duckdb
-import boto3
-from botocore.exceptions import NoCredentialsError, PartialCredentialsError
+from collections import OrderedDict
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+# duckdb, boto3, pyarrow and pandas are imported where they are first used, so the
+# application starts accepting requests before they have been loaded
+
+logger = logging.getLogger(__name__)
+
+# Where the last loaded snapshot is kept as an Arrow IPC file, to serve right away
+# after a restart. Set API_LOCAL_SNAPSHOT_PATH to an empty string to disable it.
+LOCAL_SNAPSHOT_PATH = os.environ.get(
+    'API_LOCAL_SNAPSHOT_PATH', os.path.join(tempfile.gettempdir(), 'cji_api', 'snapshot.arrow'))
+LOCAL_SNAPSHOT_METADATA_KEY = b'cji_snapshot'
+# Geometry that has not been loaded is copied from S3 to the local snapshot in batches
+PERSIST_BATCH_SIZE = int(os.environ.get('API_PERSIST_BATCH_SIZE', '50000'))
 
 class CacheManager:
     """
@@ -10,15 +27,30 @@ class CacheManager:
     Use a lock to ensure thread safety when accessing or updating the cache.
     """
     def __init__(self):
-        self._cached_data = None
-        self._cached_data_last_modified = None
-        self._lock = threading.Lock()
+        self._snapshot = None
+        self._snapshot_source = None
+        self._persisted_version = None
+        self._loading = False
+        self._load_error = None
+        self._pointer = None
+        self._history = OrderedDict()
+        self._summary = None
+        self._summary_version = None
+        self._lock = threading.RLock()
+        self._persist_lock = threading.Lock()
+        # Cleared while the background load reads the local snapshot
+        self._local_checked = threading.Event()
+        self._local_checked.set()
 
     def _get_boto3_session(self):
         """
         Create a boto3 session that can automatically refresh temporary credentials.
         Uses environment variables for access key and secret key if present.
         """
+        import boto3  # pylint: disable=C0415
+        from botocore.exceptions import (  # pylint: disable=C0415
+            NoCredentialsError, PartialCredentialsError)
+
         try:
             session = boto3.Session(
                 aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
@@ -29,64 +61,457 @@ class CacheManager:
         except (NoCredentialsError, PartialCredentialsError) as exp:
             raise RuntimeError("AWS credentials are not configured properly.") from exp
 
+    def _create_s3_connection(self, session):
+        """
+        Create a DuckDB connection that can read from S3 with the session's credentials.
+        The httpfs extension is installed with the image; it is only downloaded here
+        if it is missing.
+        """
+        import duckdb  # pylint: disable=C0415
+
+        conn = duckdb.connect(database=':memory:')
+        try:
+            conn.execute("LOAD httpfs;")
+        except duckdb.Error:
+            conn.execute("INSTALL httpfs;")
+            conn.execute("LOAD httpfs;")
+        conn.execute(f"SET s3_region='{session.region_name}';")
+        conn.execute(f"SET s3_access_key_id='{session.get_credentials().access_key}';")
+        conn.execute(f"SET s3_secret_access_key='{session.get_credentials().secret_key}';")
+
+        aws_session_token = session.get_credentials().token
+        if aws_session_token:
+            conn.execute(f"SET s3_session_token='{aws_session_token}';")
+
+        # Support S3-compatible endpoints such as MinIO or a local moto server
+        endpoint_url = os.environ.get('S3_ENDPOINT_URL')
+        if endpoint_url:
+            parsed_endpoint = urlparse(endpoint_url)
+            conn.execute(f"SET s3_endpoint='{parsed_endpoint.netloc}';")
+            conn.execute("SET s3_url_style='path';")
+            if parsed_endpoint.scheme == 'http':
+                conn.execute("SET s3_use_ssl=false;")
+        return conn
+
+    def _load_geometry(self, s3_uri, geometry_columns):
+        """
+        Load the id and geometry columns of a snapshot from S3.
+        """
+        conn = self._create_s3_connection(self._get_boto3_session())
+        try:
+            select_list = ", ".join(["id", *geometry_columns])
+            return conn.execute(f"SELECT {select_list} FROM '{s3_uri}'").fetch_arrow_table()
+        finally:
+            conn.close()
+
+    def _stream_geometry(self, s3_uri, geometry_columns, batch_size):
+        """
+        Yield the id and geometry columns of a snapshot on S3 as Arrow record batches
+        of at most batch_size rows, without holding them all in memory.
+        """
+        conn = self._create_s3_connection(self._get_boto3_session())
+        try:
+            select_list = ", ".join(["id", *geometry_columns])
+            yield from conn.execute(
+                f"SELECT {select_list} FROM '{s3_uri}'").fetch_record_batch(batch_size)
+        finally:
+            conn.close()
+
+    def _load_snapshot(self, session, s3_key, version):
+        """
+        Load a snapshot from S3. The geometry columns are only fetched once they are
+        first needed.
+        """
+        from .snapshot import Snapshot  # pylint: disable=C0415
+
+        conn = self._create_s3_connection(session)
+        try:
+            s3_uri = f"s3://{os.environ.get('S3_BUCKET_NAME')}/{s3_key}"
+            columns = [row[0] for row in
+                       conn.execute(f"DESCRIBE SELECT * FROM '{s3_uri}'").fetchall()]
+            geometry_columns = [column for column in columns
+                                if column in Snapshot.GEOMETRY_COLUMNS]
+            core_columns = [column for column in columns if column not in geometry_columns]
+            core = conn.execute(
+                f"SELECT {', '.join(core_columns)} FROM '{s3_uri}'").fetch_arrow_table()
+        finally:
+            conn.close()
+
+        # The snapshot is indexed on id, identifier and source_uri
+        return Snapshot(
+            core,
+            version=version,
+            columns=columns,
+            geometry_loader=lambda columns: self._load_geometry(s3_uri, columns),
+        )
+
+    @staticmethod
+    def _read_pointer(s3_client, s3_bucket):
+        """
+        Read the pointer to the current snapshot version written by the pipeline.
+        Returns None if the bucket only holds an unversioned snapshot.
+        """
+        from botocore.exceptions import ClientError  # pylint: disable=C0415
+
+        s3_key = os.environ.get('S3_POINTER_KEY', 'current.json')
+        try:
+            body = s3_client.get_object(Bucket=s3_bucket, Key=s3_key)['Body']
+        except ClientError as exp:
+            if exp.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                return None
+            raise
+        return json.loads(body.read())
+
+    def _apply_deltas(self, s3_client, s3_bucket, pointer):
+        """
+        Bring the cached snapshot up to the pointer's version by applying the deltas
+        of the versions in between. Returns None if that is not possible, e.g. when
+        the cached version is no longer retained, and a full reload is needed.
+        """
+        import pyarrow as pa  # pylint: disable=C0415
+        import pyarrow.parquet as pq  # pylint: disable=C0415
+        from botocore.exceptions import ClientError  # pylint: disable=C0415
+
+        entries = []
+        for entry in pointer["history"]:
+            if entry["version"] == self._snapshot.version:
+                break
+            if not entry.get("delta_key") or entry.get("previous_version") is None:
+                return None
+            entries.append(entry)
+        else:
+            return None
+
+        snapshot = self._snapshot
+        try:
+            for entry in reversed(entries):
+                body = s3_client.get_object(Bucket=s3_bucket, Key=entry["delta_key"])['Body']
+                delta = pq.read_table(pa.BufferReader(body.read()))
+                if set(delta.column_names) != {*snapshot.columns, "change"}:
+                    return None
+                s3_uri = f"s3://{s3_bucket}/{entry['key']}"
+                snapshot = snapshot.apply_delta(
+                    delta, entry["version"],
+                    geometry_loader=lambda columns, s3_uri=s3_uri: self._load_geometry(
+                        s3_uri, columns))
+        except (ClientError, RuntimeError, pa.ArrowException):
+            return None
+        return snapshot
+
     def load_data_into_cache(self):
         """
         Load the data from S3 into the cache if it has been modified.
+
+        With a versioned snapshot, a cached snapshot is brought up to date by applying
+        the deltas since its version, instead of reloading the whole dataset. Without
+        one, the snapshot is reloaded whenever its LastModified changes. The summary
+        table is refreshed as well.
+        Returns the version of the cached snapshot.
         """
+        from botocore.exceptions import ClientError  # pylint: disable=C0415
+
         with self._lock:
             session = self._get_boto3_session()
-            s3_client = session.client('s3')
+            s3_client = session.client('s3', endpoint_url=os.environ.get('S3_ENDPOINT_URL'))
 
             s3_bucket = os.environ.get('S3_BUCKET_NAME')
-            s3_key = os.environ.get('S3_PARQUET_KEY', 'all_infras_final.parquet')
+            pointer = self._read_pointer(s3_client, s3_bucket)
 
-            # Get the last modified time of the S3 object
-            response = s3_client.head_object(Bucket=s3_bucket, Key=s3_key)
-            last_modified = response['LastModified']
+            if pointer is None:
+                s3_key = os.environ.get('S3_PARQUET_KEY', 'all_infras_final.parquet')
 
-            # Check if the data has been modified
-            if self._cached_data is None or last_modified != self._cached_data_last_modified:
-                conn = duckdb.connect(database=':memory:')
-                conn.execute("INSTALL httpfs;")
-                conn.execute("LOAD httpfs;")
-                conn.execute(f"SET s3_region='{session.region_name}';")
-                conn.execute(f"SET s3_access_key_id='{session.get_credentials().access_key}';")
-                conn.execute(f"SET s3_secret_access_key='{session.get_credentials().secret_key}';")
+                # Get the last modified time of the S3 object
+                response = s3_client.head_object(Bucket=s3_bucket, Key=s3_key)
+                last_modified = response['LastModified']
 
-                aws_session_token = session.get_credentials().token
-                if aws_session_token:
-                    conn.execute(f"SET s3_session_token='{aws_session_token}';")
+                # Check if the data has been modified
+                if self._snapshot is None or last_modified != self._snapshot.version:
+                    self._snapshot = self._load_snapshot(session, s3_key, last_modified)
+                    self._snapshot_source = "s3"
 
-                s3_uri = f"s3://{s3_bucket}/{s3_key}"
-                df = conn.execute(f"SELECT * FROM '{s3_uri}'").fetchdf()
+            elif self._snapshot is None or pointer["version"] != self._snapshot.version:
+                snapshot = None
+                if self._snapshot is not None:
+                    snapshot = self._apply_deltas(s3_client, s3_bucket, pointer)
+                if snapshot is None:
+                    snapshot = self._load_snapshot(session, pointer["key"], pointer["version"])
+                self._snapshot = snapshot
+                self._snapshot_source = "s3"
 
-                # Store the DataFrame in the cache and update the last modified time
-                self._cached_data = df
-                self._cached_data_last_modified = last_modified
+            self._pointer = pointer
 
-                conn.close()
+            # The pipeline writes the summary together with the snapshot, keep them in step
+            try:
+                self._load_summary(s3_client, s3_bucket)
+            except ClientError:
+                logger.exception("Refreshing the summary failed, keeping the cached summary")
+            return self._snapshot.version
 
-    def get_cached_data(self):
+    def load_local_snapshot(self):
         """
-        Get the cached DataFrame. If the cache is empty, it will load the data.
+        Load the snapshot persisted by persist_snapshot, unless a snapshot is already
+        cached. The file is memory-mapped, so this is fast even for large snapshots.
+        Returns True if the local snapshot was loaded.
         """
+        if not LOCAL_SNAPSHOT_PATH or not os.path.exists(LOCAL_SNAPSHOT_PATH):
+            return False
+
+        import pyarrow as pa  # pylint: disable=C0415
+        from .snapshot import Snapshot  # pylint: disable=C0415
+
+        table = pa.ipc.open_file(pa.memory_map(LOCAL_SNAPSHOT_PATH)).read_all()
+        metadata = json.loads(table.schema.metadata[LOCAL_SNAPSHOT_METADATA_KEY])
+        version = metadata["version"]
+        if metadata["pointer"] is None:
+            # Unversioned snapshots are identified by their LastModified
+            version = datetime.fromisoformat(version)
+
         with self._lock:
-            if self._cached_data is None:
+            if self._snapshot is not None:
+                return False
+            self._snapshot = Snapshot.from_table(table.replace_schema_metadata(None), version)
+            self._snapshot_source = "local"
+            self._persisted_version = version
+            self._pointer = metadata["pointer"]
+        return True
+
+    def _snapshot_batches(self, snapshot, s3_key):
+        """
+        Yield the full dataset of a snapshot in batches. Geometry columns it has not
+        loaded are streamed from its file on S3 rather than loaded into the snapshot.
+        """
+        import pyarrow as pa  # pylint: disable=C0415
+
+        table = snapshot.loaded_table.combine_chunks()
+        missing = [column for column in snapshot.geometry_columns
+                   if column not in table.column_names]
+        if not missing:
+            yield from table.to_batches(max_chunksize=PERSIST_BATCH_SIZE)
+            return
+
+        s3_uri = f"s3://{os.environ.get('S3_BUCKET_NAME')}/{s3_key}"
+        offset = 0
+        for geometry in self._stream_geometry(s3_uri, missing, PERSIST_BATCH_SIZE):
+            rows = pa.RecordBatch.from_arrays(
+                [column.chunk(0) for column in table.slice(offset, geometry.num_rows).columns],
+                names=table.column_names)
+            if not rows.column("id").equals(geometry.column("id")):
+                raise RuntimeError("The geometry on S3 does not match the cached snapshot.")
+            values = {**dict(zip(rows.schema.names, rows.columns)),
+                      **dict(zip(geometry.schema.names, geometry.columns))}
+            yield pa.RecordBatch.from_arrays([values[column] for column in snapshot.columns],
+                                             names=snapshot.columns)
+            offset += geometry.num_rows
+        if offset != table.num_rows:
+            raise RuntimeError("The geometry on S3 does not match the cached snapshot.")
+
+    def persist_snapshot(self):
+        """
+        Write the cached snapshot, geometry included, to the local snapshot file if it
+        changed since it was last written. Geometry the snapshot has not loaded is
+        copied from S3 in batches, so persisting does not load it into memory.
+        """
+        import pyarrow as pa  # pylint: disable=C0415
+
+        with self._persist_lock:
+            with self._lock:
+                snapshot, pointer = self._snapshot, self._pointer
+            if (not LOCAL_SNAPSHOT_PATH or snapshot is None
+                    or snapshot.version == self._persisted_version):
+                return
+
+            version = snapshot.version
+            metadata = {"version": version if pointer is not None else version.isoformat(),
+                        "pointer": pointer}
+            s3_key = (pointer["key"] if pointer is not None else
+                      os.environ.get('S3_PARQUET_KEY', 'all_infras_final.parquet'))
+
+            batches = self._snapshot_batches(snapshot, s3_key)
+            first_batch = next(batches, None)
+            if first_batch is None:
+                return
+            schema = first_batch.schema.with_metadata(
+                {LOCAL_SNAPSHOT_METADATA_KEY: json.dumps(metadata)})
+
+            # A unique temporary file, so concurrent writers never share one
+            directory = os.path.dirname(LOCAL_SNAPSHOT_PATH) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f, pa.ipc.new_file(f, schema) as writer:
+                    for batch in itertools.chain([first_batch], batches):
+                        writer.write_batch(batch)
+                os.replace(tmp_path, LOCAL_SNAPSHOT_PATH)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            self._persisted_version = version
+
+    def _background_load(self):
+        try:
+            try:
+                if self.load_local_snapshot():
+                    logger.info("Serving the local snapshot %s", self._snapshot.version)
+            except Exception:  # pylint: disable=W0718
+                logger.exception("Could not load the local snapshot, loading from S3")
+            finally:
+                self._local_checked.set()
+            self.load_data_into_cache()
+            self._load_error = None
+            self.persist_snapshot()
+        except Exception as exp:  # pylint: disable=W0718
+            self._load_error = str(exp)
+            logger.exception("Loading the snapshot failed")
+        finally:
+            self._loading = False
+
+    def start_background_load(self):
+        """
+        Load the data in a background thread: the local snapshot first, if there is
+        one, then the current version from S3. Requests that need the data before it
+        is loaded wait for it.
+        """
+        self._loading = True
+        self._local_checked.clear()
+        thread = threading.Thread(target=self._background_load, name="snapshot-loader",
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        """
+        Describe the cached snapshot: whether one is loaded, its version and where it
+        came from, and whether a load is in progress or has failed.
+        """
+        snapshot = self._snapshot
+        return {
+            "ready": snapshot is not None,
+            "version": str(snapshot.version) if snapshot is not None else None,
+            "source": self._snapshot_source if snapshot is not None else None,
+            "loading": self._loading,
+            "error": self._load_error,
+        }
+
+    def _version_as_of(self, as_of):
+        """
+        Return the pointer entry of the version that was current at the as_of datetime.
+        """
+        if self._pointer is None:
+            raise LookupError("The data is not versioned, only the current version is available.")
+
+        if as_of.tzinfo is None:
+            as_of = as_of.replace(tzinfo=timezone.utc)
+        for entry in self._pointer["history"]:
+            if datetime.fromisoformat(entry["created_at"]) <= as_of:
+                return entry
+        raise LookupError(f"No retained version existed at {as_of.isoformat()}.")
+
+    def get_snapshot(self, as_of=None):
+        """
+        Get the cached snapshot. If the cache is empty, it will load the data.
+        With an as_of datetime, get the version that was current at that time;
+        the most recently used older versions are kept in memory as well.
+        """
+        # The current snapshot is served without waiting for a load in progress
+        snapshot = self._snapshot
+        if snapshot is not None and as_of is None:
+            return snapshot
+
+        # Rather than loading from S3 here, wait for a local snapshot being read
+        self._local_checked.wait()
+        with self._lock:
+            if self._snapshot is None:
                 self.load_data_into_cache()
-            return self._cached_data
+            if as_of is None:
+                return self._snapshot
+
+            entry = self._version_as_of(as_of)
+            if entry["version"] == self._snapshot.version:
+                return self._snapshot
+            if entry["version"] in self._history:
+                self._history.move_to_end(entry["version"])
+                return self._history[entry["version"]]
+
+            snapshot = self._load_snapshot(self._get_boto3_session(), entry["key"],
+                                           entry["version"])
+            self._history[entry["version"]] = snapshot
+            while len(self._history) > int(os.environ.get('API_MAX_HISTORY_SNAPSHOTS', '2')):
+                self._history.popitem(last=False)
+            return snapshot
+
+    def get_cached_data(self):
+        """
+        Get the cached data as an Arrow table. If the cache is empty, it will load the data.
+        """
+        return self.get_snapshot().table
+
+    def _load_summary(self, s3_client, s3_bucket):
+        """
+        Load the summary table from S3 if it has been modified. The summary is small,
+        so it is read in one request without DuckDB. Returns False if there is none.
+        """
+        import pyarrow as pa  # pylint: disable=C0415
+        import pyarrow.parquet as pq  # pylint: disable=C0415
+        from botocore.exceptions import ClientError  # pylint: disable=C0415
+
+        s3_key = os.environ.get('S3_SUMMARY_KEY', 'infras_summary.parquet')
+        try:
+            response = s3_client.head_object(Bucket=s3_bucket, Key=s3_key)
+        except ClientError as exp:
+            if exp.response.get('Error', {}).get('Code') in ('NoSuchKey', 'NotFound', '404'):
+                return False
+            raise
+        # The ETag changes with the content, even for rewrites within the same second
+        etag = response['ETag'].strip('"')
+
+        if self._summary is None or etag != self._summary_version:
+            body = s3_client.get_object(Bucket=s3_bucket, Key=s3_key)['Body']
+            self._summary = pq.read_table(pa.BufferReader(body.read()))
+            self._summary_version = etag
+        return True
+
+    def load_summary_into_cache(self):
+        """
+        Load the summary table from S3 into the cache if it has been modified.
+        Raises LookupError if the pipeline has not written a summary yet.
+        """
+        with self._lock:
+            session = self._get_boto3_session()
+            s3_client = session.client('s3', endpoint_url=os.environ.get('S3_ENDPOINT_URL'))
+            if not self._load_summary(s3_client, os.environ.get('S3_BUCKET_NAME')):
+                if self._summary is None:
+                    raise LookupError("The summary statistics are not available yet.")
+
+    def get_summary(self):
+        """
+        Get the cached summary table and its version. If the cache is empty,
+        it will load the summary; raises LookupError if there is none.
+        """
+        with self._lock:
+            if self._summary is None:
+                self.load_summary_into_cache()
+            return self._summary, self._summary_version
 
     def clear_cache(self):
         """
         Clear the cached data.
         """
         with self._lock:
-            self._cached_data = None
-            self._cached_data_last_modified = None
+            self._snapshot = None
+            self._snapshot_source = None
+            self._pointer = None
+            self._history.clear()
+            self._summary = None
+            self._summary_version = None
 
-    def create_duckdb_connection(self):
+    def create_duckdb_connection(self, as_of=None, geometry_columns=None):
         """
-        Create a DuckDB connection with the cached data registered.
+        Create a DuckDB connection with the cached data, or the version as of a
+        given time, registered. Only the given geometry columns are loaded, by
+        default all of them.
         """
+        import duckdb  # pylint: disable=C0415
+
         conn = duckdb.connect(database=':memory:')
-        conn.register('all_infras', self.get_cached_data())
+        self.get_snapshot(as_of).register(conn, 'all_infras', geometry_columns)
         return conn
@@ -1,16 +1,46 @@
 # src/db/crud.py
 
-from typing import List, Optional, Tuple
-from .database import get_db_connection
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from .database import get_db_connection, cache_manager
 
-def get_infras(limit: int = 10, offset: int = 0, filters: Optional[dict] = None,
-               sort_by: str = "id", sort_order: str = "asc") -> List[Tuple]:
+# Columns of the summary table that statistics can be grouped by
+STATS_DIMENSIONS = ["source_system", "location_type_label", "city", "postal_code"]
+
+# A point in time, to read the version of the data that was current then
+AsOf = Optional[datetime]
+
+# Column replacements that return a cheaper representation of the geometry in the
+# 'geojson' field. The other geometry columns are left out of the response.
+_WITHOUT_GEOMETRY = ("NULL AS point, NULL AS gml, "
+                     "NULL AS geojson_simplified, NULL AS geojson_coarse")
+GEOMETRY_SELECTS = {
+    "full": "*",
+    "simplified": f"* REPLACE (geojson_simplified AS geojson, {_WITHOUT_GEOMETRY})",
+    "coarse": f"* REPLACE (geojson_coarse AS geojson, {_WITHOUT_GEOMETRY})",
+    "centroid": f"""* REPLACE (
+        CASE WHEN centroid_lon IS NOT NULL
+             THEN '{{"type": "Point", "coordinates": ['
+                  || centroid_lon || ', ' || centroid_lat || ']}}'
+        END AS geojson,
+        {_WITHOUT_GEOMETRY})""",
+}
+
+# The geometry columns each representation reads; None for all of them. The other
+# geometry columns are not loaded into the cache for the query.
+GEOMETRY_COLUMNS_READ = {
+    "full": None,
+    "simplified": ["geojson_simplified"],
+    "coarse": ["geojson_coarse"],
+    "centroid": [],
+}
+
+def _infras_query(limit: int, offset: int, filters: Optional[dict], sort_by: str,
+                  sort_order: str, geometry: str) -> Tuple[str, list]:
     """
-    Retrieve a list of infrastructures with pagination, filtering, and sorting.
+    Build the query and parameters for a page of infrastructures.
     """
-    conn = get_db_connection()
-
-    query = "SELECT * FROM all_infras"
+    query = f"SELECT {GEOMETRY_SELECTS[geometry]} FROM all_infras"
     params = []
 
     # Add filtering to the query if filters are provided
@@ -31,13 +61,104 @@ def get_infras(limit: int = 10, offset: int = 0, filters: Optional[dict] = None,
 
     query += f" ORDER BY {sort_by} {sort_order.upper()} LIMIT ? OFFSET ?"
     params.extend([limit, offset])
+    return query, params
 
+def get_infras(limit: int = 10, offset: int = 0, filters: Optional[dict] = None,
+               sort_by: str = "id", sort_order: str = "asc",
+               geometry: str = "full", as_of: AsOf = None) -> List[Tuple]:
+    """
+    Retrieve a list of infrastructures with pagination, filtering, and sorting.
+    The geometry argument selects the representation returned in 'geojson',
+    see GEOMETRY_SELECTS.
+    """
+    conn = get_db_connection(as_of, GEOMETRY_COLUMNS_READ[geometry])
+    query, params = _infras_query(limit, offset, filters, sort_by, sort_order, geometry)
     return conn.execute(query, params).fetchall()
 
-def get_infra_detail(identifier: str) -> Tuple:
+def stream_infras(limit: int = 10, offset: int = 0, filters: Optional[dict] = None,
+                  sort_by: str = "id", sort_order: str = "asc", geometry: str = "full",
+                  batch_size: int = 1000, as_of: AsOf = None) -> Iterator[List[dict]]:
+    """
+    Like get_infras, but yield the rows as dicts in batches of at most batch_size,
+    pulled from the DuckDB result as Arrow record batches. The connection stays
+    open until the last batch has been consumed.
+    """
+    conn = get_db_connection(as_of, GEOMETRY_COLUMNS_READ[geometry])
+    try:
+        query, params = _infras_query(limit, offset, filters, sort_by, sort_order, geometry)
+        reader = conn.execute(query, params).fetch_record_batch(batch_size)
+        for batch in reader:
+            yield _non_finite_to_null(batch).to_pylist()
+    finally:
+        conn.close()
+
+def _non_finite_to_null(batch):
+    """
+    Replace NaN and infinity in the float columns of a record batch with null, as the
+    response schema does for the rows it validates.
+    """
+    import pyarrow as pa  # pylint: disable=C0415
+    import pyarrow.compute as pc  # pylint: disable=C0415
+
+    columns = [pc.if_else(pc.is_finite(column), column, pa.scalar(None, column.type))
+               if pa.types.is_floating(column.type) else column
+               for column in batch.columns]
+    return pa.RecordBatch.from_arrays(columns, schema=batch.schema)
+
+def get_infra_detail(identifier: str, as_of: AsOf = None) -> Optional[Tuple]:
     """
     Retrieve details of a specific infrastructure by its identifier.
+    Uses the hash index of the cached snapshot instead of scanning the table.
+    """
+    try:
+        infra_id = int(identifier)
+    except ValueError:
+        return None
+    return cache_manager.get_snapshot(as_of).lookup("id", infra_id)
+
+def get_infra_by_key(column: str, value: str, as_of: AsOf = None) -> Optional[Tuple]:
+    """
+    Retrieve an infrastructure by one of its natural keys ('identifier' or 'source_uri').
+    """
+    return cache_manager.get_snapshot(as_of).lookup(column, value)
+
+def lookup_infras(keys: Dict[str, list],
+                  as_of: AsOf = None) -> Tuple[List[Tuple], Dict[str, list]]:
     """
-    conn = get_db_connection()
-    query = "SELECT * FROM all_infras WHERE id = ?"
-    return conn.execute(query, (identifier,)).fetchone()
+    Resolve many keys in one call. keys maps an indexed column ('id', 'identifier'
+    or 'source_uri') to the values to look up.
+    Returns the rows that were found and, per column, the values that were not.
+    """
+    snapshot = cache_manager.get_snapshot(as_of)
+    rows = []
+    missing = {}
+    for column, values in keys.items():
+        missing[column] = []
+        for value, row in zip(values, snapshot.lookup_many(column, values)):
+            if row is None:
+                missing[column].append(value)
+            else:
+                rows.append(row)
+    return rows, missing
+
+def get_stats(group_by: List[str]) -> Tuple[List[str], List[Tuple]]:
+    """
+    Aggregate the precomputed summary table by the given dimensions.
+    Returns the names of the result columns and the rows, largest groups first.
+    """
+    import duckdb  # pylint: disable=C0415
+
+    summary, _ = cache_manager.get_summary()
+    counts = [column for column in summary.column_names if column not in STATS_DIMENSIONS]
+    select_list = [*group_by, *(f"sum({column})::BIGINT AS {column}" for column in counts)]
+
+    query = f"SELECT {', '.join(select_list)} FROM infras_summary"
+    if group_by:
+        query += f" GROUP BY {', '.join(group_by)}"
+    query += f" ORDER BY {', '.join(['num_records DESC', *group_by])}"
+
+    with duckdb.connect(database=':memory:') as conn:
+        conn.register("infras_summary", summary)
+        cursor = conn.execute(query)
+        columns = [description[0] for description in cursor.description]
+        return columns, cursor.fetchall()
@@ -3,8 +3,8 @@ from .cache_manager import CacheManager
 # Create a single instance of CacheManager for the application
 cache_manager = CacheManager()
 
-def get_db_connection():
+def get_db_connection(as_of=None, geometry_columns=None):
     """
     Get a DuckDB connection with the cached data registered.
     """
-    return cache_manager.create_duckdb_connection()
+    return cache_manager.create_duckdb_connection(as_of, geometry_columns)
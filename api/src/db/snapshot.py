@@ -0,0 +1,196 @@
+import threading
+from typing import Any, Callable, Hashable, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+class KeyIndex:
+    """
+    Compact hash index from the values of a single column to row positions.
+    Built on a pandas Index (a C hash table) rather than a Python dict. For columns
+    with duplicate values the first occurrence wins.
+    """
+    def __init__(self, values: pd.Series):
+        not_null = values.notna().to_numpy()
+        first_occurrence = not_null & ~values.duplicated(keep="first").to_numpy()
+        self._positions = np.flatnonzero(first_occurrence)
+        self._index = pd.Index(values.to_numpy()[first_occurrence])
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, key: Hashable) -> Optional[int]:
+        """Return the row position of a single key, or None."""
+        try:
+            return int(self._positions[self._index.get_loc(key)])
+        except (KeyError, TypeError):
+            return None
+
+    def get_many(self, keys: List[Hashable]) -> List[Optional[int]]:
+        """Return the row positions of many keys at once, with None for missing keys."""
+        if not keys:
+            return []
+        indexer = self._index.get_indexer(keys)
+        return [int(self._positions[i]) if i >= 0 else None for i in indexer]
+
+def _single_chunk(column: pa.ChunkedArray) -> pa.Array:
+    """Return a chunked column as one contiguous array for fast positional access."""
+    if column.num_chunks == 1:
+        return column.chunk(0)
+    return column.combine_chunks()
+
+class Snapshot:
+    """
+    A loaded version of the all_infras dataset, held as Arrow.
+
+    Low-cardinality columns are dictionary-encoded and each of the large geometry
+    string columns is only loaded once a query or lookup needs it. Hash indexes on
+    id, identifier and source_uri make point lookups independent of table size.
+    """
+    INDEXED_COLUMNS = ("id", "identifier", "source_uri")
+    CATEGORICAL_COLUMNS = ("source_system", "location_type_uri", "location_type_label",
+                           "infra_type_uri", "namespace", "city", "postal_code")
+    GEOMETRY_COLUMNS = ("point", "gml", "geojson", "geojson_simplified", "geojson_coarse")
+
+    def __init__(self, core: pa.Table, version: Any, columns: Optional[List[str]] = None,
+                 geometry_loader: Optional[Callable[[List[str]], pa.Table]] = None):
+        """
+        Args:
+            core: The non-geometry columns. Categorical columns are dictionary-encoded here.
+            version: Identifies the version of the data, e.g. the S3 LastModified.
+            columns: The full column order of the dataset, including geometry columns.
+            geometry_loader: Returns 'id' plus the requested geometry columns, in the
+                same row order.
+        """
+        self.core = self._encode_categoricals(core.combine_chunks())
+        self.version = version
+        self.columns = columns or self.core.column_names
+        self.geometry_columns = [column for column in self.columns
+                                 if column not in self.core.column_names]
+        self._geometry_loader = geometry_loader
+        self._null_column = None
+        self._table = None
+        self._lock = threading.Lock()
+
+        self.indexes = {column: KeyIndex(self.core.column(column).to_pandas())
+                        for column in self.INDEXED_COLUMNS if column in self.core.column_names}
+        self._values = {column: _single_chunk(self.core.column(column))
+                        for column in self.core.column_names}
+
+    @classmethod
+    def from_table(cls, table: pa.Table, version: Any) -> "Snapshot":
+        """Build a snapshot from a table that already contains every column."""
+        geometry_columns = [column for column in cls.GEOMETRY_COLUMNS
+                            if column in table.column_names]
+        core = table.drop_columns(geometry_columns)
+        return cls(core, version, columns=table.column_names,
+                   geometry_loader=lambda columns: table.select(["id", *columns]))
+
+    def apply_delta(self, delta: pa.Table, version: Any,
+                    geometry_loader: Optional[Callable[[List[str]], pa.Table]] = None
+                    ) -> "Snapshot":
+        """
+        Return the next version of this snapshot by applying a delta written by the
+        pipeline: every row whose id is in the delta is dropped, then the added and
+        changed rows are appended. The rows stay sorted by id.
+
+        Only the core columns are updated; the geometry of the new version is loaded
+        with geometry_loader, like after a full load.
+        """
+        core = self.core.filter(pc.invert(pc.is_in(
+            self.core.column("id"), value_set=delta.column("id").combine_chunks())))
+        core = core.cast(pa.schema([
+            pa.field(field.name, field.type.value_type) if pa.types.is_dictionary(field.type)
+            else field for field in core.schema]))
+
+        upserts = delta.filter(pc.not_equal(delta.column("change"), "removed"))
+        upserts = upserts.select(core.column_names).cast(core.schema)
+        core = pa.concat_tables([core, upserts]).sort_by("id")
+        return Snapshot(core, version, columns=self.columns, geometry_loader=geometry_loader)
+
+    def _encode_categoricals(self, table: pa.Table) -> pa.Table:
+        for column in self.CATEGORICAL_COLUMNS:
+            if column not in table.column_names:
+                continue
+            position = table.column_names.index(column)
+            if not pa.types.is_dictionary(table.schema.field(position).type):
+                table = table.set_column(position, column,
+                                         pc.dictionary_encode(table.column(position)))
+        return table
+
+    def __len__(self) -> int:
+        return self.core.num_rows
+
+    def load_geometry(self, columns: Optional[Iterable[str]] = None):
+        """Load the given geometry columns, by default all of them, if not loaded yet."""
+        columns = self.geometry_columns if columns is None else list(columns)
+        if self._geometry_loader is None or all(column in self._values for column in columns):
+            return
+        with self._lock:
+            missing = [column for column in columns if column not in self._values]
+            if not missing:
+                return
+            geometry = self._geometry_loader(missing)
+            if not geometry.column("id").equals(self.core.column("id")):
+                raise RuntimeError("The geometry does not match the loaded snapshot, "
+                                   "the data has changed and the cache must be reloaded.")
+            geometry = geometry.drop_columns(["id"]).combine_chunks()
+            self._values.update({column: _single_chunk(geometry.column(column))
+                                 for column in geometry.column_names})
+
+    @property
+    def table(self) -> pa.Table:
+        """The full dataset in its original column order, geometry included."""
+        if self._table is None:
+            self.load_geometry()
+            self._table = pa.Table.from_arrays([self._values[column] for column in self.columns],
+                                               names=self.columns)
+        return self._table
+
+    @property
+    def loaded_table(self) -> pa.Table:
+        """
+        The dataset in its original column order, without the geometry columns that
+        have not been loaded yet.
+        """
+        values = dict(self._values)
+        columns = [column for column in self.columns if column in values]
+        return pa.Table.from_arrays([values[column] for column in columns], names=columns)
+
+    def relation(self, geometry_columns: Optional[Iterable[str]] = None) -> pa.Table:
+        """
+        The dataset in its original column order, with only the given geometry columns
+        loaded. Geometry columns that have not been loaded are all null.
+        """
+        if geometry_columns is None:
+            return self.table
+        self.load_geometry(geometry_columns)
+        if self._null_column is None:
+            self._null_column = pa.nulls(len(self), type=pa.string())
+        return pa.Table.from_arrays([self._values.get(column, self._null_column)
+                                     for column in self.columns], names=self.columns)
+
+    def register(self, conn, name: str = "all_infras",
+                 geometry_columns: Optional[Iterable[str]] = None):
+        """
+        Register the snapshot on a DuckDB connection, with the given geometry columns
+        or all of them. DuckDB scans the Arrow data in place, dictionary-encoded
+        columns included.
+        """
+        conn.register(name, self.relation(geometry_columns))
+
+    def row(self, position: int) -> Tuple:
+        """Return the row at a position as a tuple in column order."""
+        self.load_geometry()
+        return tuple(self._values[column][position].as_py() for column in self.columns)
+
+    def lookup(self, column: str, key: Hashable) -> Optional[Tuple]:
+        """Return the row whose indexed column equals key, or None."""
+        position = self.indexes[column].get(key)
+        return None if position is None else self.row(position)
+
+    def lookup_many(self, column: str, keys: Iterable[Hashable]) -> List[Optional[Tuple]]:
+        """Resolve many keys of an indexed column in one pass."""
+        positions = self.indexes[column].get_many(list(keys))
+        return [None if position is None else self.row(position) for position in positions]
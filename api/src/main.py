@@ -3,16 +3,20 @@ from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import infrastructure
+from .routers import health, infrastructure, stats
 from .db.database import cache_manager
+from .middleware import CompressionMiddleware
 
 # Load environment variables from .env if it exists
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'), override=True)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI): # pylint: disable=W0621,W0613
-    """Load the data into cache on application startup."""
-    cache_manager.load_data_into_cache()
+    """
+    Start loading the data into cache on application startup, in the background,
+    so the application accepts requests right away. /ready reports when it is loaded.
+    """
+    cache_manager.start_background_load()
     yield
 
 app = FastAPI(
@@ -32,4 +36,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses with zstd or gzip
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.environ.get("API_COMPRESSION_MIN_SIZE", "1024")),
+)
+
+app.include_router(health.router, tags=["health"])
 app.include_router(infrastructure.router, prefix="/api", tags=["infrastructures"])
+app.include_router(stats.router, prefix="/api", tags=["statistics"])
@@ -1 +1,3 @@
+from .health import router as health_router
 from .infrastructure import router as infrastructure_router
+from .stats import router as stats_router
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Response, status
+from ..db.database import cache_manager
+
+router = APIRouter()
+
+@router.get("/health")
+def health():
+    """
+    Liveness probe: the application is up and handling requests, whether or not
+    the data has been loaded yet.
+    """
+    return {"status": "ok"}
+
+@router.get("/ready")
+def ready(response: Response):
+    """
+    Readiness probe: 200 once a snapshot of the data is loaded and can be served,
+    503 before that. Also reports the version of the snapshot and where it came from.
+    """
+    cache_status = cache_manager.status()
+    if not cache_status["ready"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return cache_status
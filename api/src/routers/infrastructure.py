@@ -1,18 +1,122 @@
 import os
-from typing import Optional
-from fastapi import APIRouter, HTTPException, Header, Query, status
+import json
+import hashlib
+import itertools
+from datetime import datetime
+from typing import Iterator, List, Optional
+from fastapi import APIRouter, HTTPException, Header, Query, Request, Response, status
 from fastapi.params import Depends
-from ..db import crud, cache_manager
-from ..schemas.infrastructure import InfraList, InfraDetail, InfraBase
-
-cache_manager = cache_manager.CacheManager()
+from fastapi.responses import StreamingResponse
+from ..db import crud
+from ..db.database import cache_manager
+from ..middleware import strip_content_coding
+from ..schemas.infrastructure import (InfraList, InfraDetail, InfraBase, InfraLookupRequest,
+                                      InfraLookupResponse)
 
 router = APIRouter()
 
 ALL_COLS = ["id", "location_name", "location_type_uri", "location_type_label", "infra_type_uri",
-            "street", "house_number", "postal_code", "city", "uwp_sourcd_dp", "created_by",
-            "source_uri", "adresregister_uri", "perceel_uri", "source_system", "identifier", "localid", 
-            "namespace", "point", "gml", "geojson"]
+            "street", "house_number", "postal_code", "city", "uwp_source_dp", "created_by",
+            "source_uri", "adresregister_uri", "perceel_uri", "source_system", "identifier",
+            "localid", "namespace", "point", "gml", "geojson", "centroid_lon", "centroid_lat",
+            "bbox_min_lon", "bbox_min_lat", "bbox_max_lon", "bbox_max_lat", "geojson_simplified",
+            "geojson_coarse"]
+
+# Maximum number of keys that can be resolved in a single batch lookup
+MAX_LOOKUP_KEYS = int(os.environ.get('API_MAX_LOOKUP_KEYS', '1000'))
+
+# Hard cap on the page size of /infras. Pages larger than the streaming threshold are
+# encoded and sent in batches instead of being built in memory as a whole.
+MAX_LIMIT = int(os.environ.get('API_MAX_LIMIT', '50000'))
+STREAMING_THRESHOLD = int(os.environ.get('API_STREAMING_THRESHOLD', '1000'))
+STREAMING_BATCH_SIZE = int(os.environ.get('API_STREAMING_BATCH_SIZE', '1000'))
+
+# Clients may reuse a response, but must revalidate it with its ETag first
+CACHE_CONTROL = "no-cache"
+
+def make_etag(*parts, version=None) -> str:
+    """
+    Build a strong ETag from the version of the cached data, by default the
+    snapshot, and the normalized query parameters.
+    """
+    if version is None:
+        version = cache_manager.get_snapshot().version
+    digest = hashlib.sha256(repr((str(version), *parts)).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """
+    Return a 304 response if the request's If-None-Match matches the ETag.
+    The 304 carries the server's strong ETag, with the content-coding of the
+    representation the client holds, rather than the tag the client sent.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            current = etag
+        else:
+            current = tag.removeprefix("W/")
+            if strip_content_coding(current) != etag:
+                continue
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                        headers={"ETag": current, "Cache-Control": CACHE_CONTROL})
+    return None
+
+def set_validators(response: Response, etag: str):
+    """Add the ETag and Cache-Control headers to a response."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+def encode_json(value) -> str:
+    """Encode a value the way FastAPI's JSONResponse does."""
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":"))
+
+def stream_infra_list(batches: Iterator[List[dict]], limit: int, offset: int) -> Iterator[bytes]:
+    """
+    Encode batches of rows as an InfraList JSON document, one chunk per batch.
+    The total is only known at the end, so it follows the items.
+    """
+    yield b'{"items":['
+    total = 0
+    for batch in batches:
+        if not batch:
+            continue
+        separator = "," if total else ""
+        yield (separator + ",".join(encode_json(row) for row in batch)).encode("utf-8")
+        total += len(batch)
+    yield f'],"total":{total},"limit":{limit},"offset":{offset}}}'.encode("utf-8")
+
+def parse_as_of(as_of: Optional[str]) -> Optional[datetime]:
+    """
+    Parse the as_of query parameter: an ISO 8601 date or datetime, UTC unless it has
+    an offset. A version name such as '20241019T053000Z' is a valid value too.
+    """
+    if as_of is None:
+        return None
+    try:
+        return datetime.fromisoformat(as_of)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid as_of parameter. Must be an ISO 8601 date or datetime."
+        ) from e
+
+def snapshot_version(as_of: Optional[datetime]):
+    """
+    Return the version of the snapshot that was current at as_of, or of the
+    current snapshot.
+    """
+    try:
+        return cache_manager.get_snapshot(as_of).version
+    except LookupError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e)) from e
+
+AS_OF_DESCRIPTION = "Read the version of the data that was current at this ISO 8601 \
+                                    date or datetime (UTC by default), out of the retained versions"
 
 def verify_api_key(api_key: str = Header(...)):
     """Poor man's authentication method."""
@@ -25,7 +129,10 @@ def verify_api_key(api_key: str = Header(...)):
 
 @router.get("/infras", response_model=InfraList, dependencies=[Depends(verify_api_key)])
 def read_infras(
-        limit: int = Query(10, ge=1, description="The number of records to retrieve"),
+        request: Request,
+        response: Response,
+        limit: int = Query(10, ge=1, le=MAX_LIMIT, description="The number of records \
+                                    to retrieve"),
         offset: int = Query(0, ge=0, description="The number of records to skip \
                                     before starting to return records"),
         filters: Optional[str] = Query(None, description="Boolean logic filter to filter \
@@ -33,16 +140,23 @@ def read_infras(
                                     infra_type_uri=https://data.vlaanderen.be/ns/gebouw#Gebouw')"),
         sort_by: Optional[str] = Query("id", description="The column to sort by"),
         sort_order: Optional[str] = Query("asc", regex="^(asc|desc)$", description="Sort \
-                                    order: 'asc' or 'desc'")):
+                                    order: 'asc' or 'desc'"),
+        geometry: str = Query("full", regex="^(full|simplified|coarse|centroid)$",
+                              description="The geometry returned in 'geojson': 'full', the \
+                                    'simplified' or 'coarse' outline, or only the 'centroid'"),
+        as_of: Optional[str] = Query(None, description=AS_OF_DESCRIPTION)):
     """
     Retrieve a paginated list of infrastructure records with filtering and sorting.
 
     Args:
-        limit (int): The maximum number of records to return.
+        limit (int): The maximum number of records to return. Pages larger than
+            STREAMING_THRESHOLD are streamed.
         offset (int): The number of records to skip before starting to return records.
         filters (str): Boolean logic filter to filter the records by.
         sort_by (str): The column to sort by.
         sort_order (str): Sort order, either ascending ('asc') or descending ('desc').
+        geometry (str): The geometry representation to return, from 'full' to 'centroid'.
+        as_of (str): Read the version of the data that was current at this time.
 
     Returns:
         InfraList: A list of infrastructure records with pagination details.
@@ -54,12 +168,49 @@ def read_infras(
             detail=f"Invalid sort_by parameter. Must be one of: {', '.join(ALL_COLS)}"
         )
 
+    # Answer conditional requests without running the query
+    as_of_time = parse_as_of(as_of)
+    etag = make_etag("infras", limit, offset, filters, sort_by, sort_order.lower(),
+                     geometry, version=snapshot_version(as_of_time))
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+
+    if limit > STREAMING_THRESHOLD:
+        batches = crud.stream_infras(
+            limit=limit,
+            offset=offset,
+            filters=filters,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            geometry=geometry,
+            batch_size=STREAMING_BATCH_SIZE,
+            as_of=as_of_time
+        )
+
+        # Fetch the first batch up front, so an empty result can still be a 404
+        first_batch = next(batches, [])
+        if not first_batch:
+            batches.close()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No infrastructure records found."
+            )
+
+        return StreamingResponse(
+            stream_infra_list(itertools.chain([first_batch], batches), limit, offset),
+            media_type="application/json",
+            headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        )
+
     rows = crud.get_infras(
         limit=limit,
         offset=offset,
         filters=filters,
         sort_by=sort_by,
-        sort_order=sort_order
+        sort_order=sort_order,
+        geometry=geometry,
+        as_of=as_of_time
     )
 
     if not rows:
@@ -73,23 +224,109 @@ def read_infras(
                 for row in rows]
 
     total = len(items)
+    set_validators(response, etag)
     return InfraList(items=items, total=total, limit=limit, offset=offset)
 
 
+@router.get("/infras/lookup", response_model=InfraDetail, dependencies=[Depends(verify_api_key)])
+def read_infra_by_key(
+        request: Request,
+        response: Response,
+        identifier: Optional[str] = Query(None, description="The identifier of the record \
+                                    in its source system"),
+        source_uri: Optional[str] = Query(None, description="The source URI of the record"),
+        as_of: Optional[str] = Query(None, description=AS_OF_DESCRIPTION)):
+    """
+    Retrieve a single infrastructure record by its natural key.
+
+    Args:
+        identifier (str): The identifier of the record in its source system.
+        source_uri (str): The source URI of the record.
+        as_of (str): Read the version of the data that was current at this time.
+
+    Returns:
+        InfraDetail: Detailed information about a single infrastructure record.
+    """
+    if (identifier is None) == (source_uri is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of 'identifier' or 'source_uri'."
+        )
+
+    if identifier is not None:
+        column, value = "identifier", identifier
+    else:
+        column, value = "source_uri", source_uri
+
+    as_of_time = parse_as_of(as_of)
+    etag = make_etag("infra_by_key", column, value, version=snapshot_version(as_of_time))
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+
+    row = crud.get_infra_by_key(column, value, as_of=as_of_time)
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Infrastructure with {column} '{value}' not found."
+        )
+
+    set_validators(response, etag)
+    return InfraDetail(**dict(zip(ALL_COLS, row)))
+
+@router.post("/infras/lookup", response_model=InfraLookupResponse,
+             dependencies=[Depends(verify_api_key)])
+def lookup_infras(request: InfraLookupRequest,
+                  as_of: Optional[str] = Query(None, description=AS_OF_DESCRIPTION)):
+    """
+    Resolve many infrastructure records by id, identifier and/or source URI in one call.
+
+    Args:
+        request (InfraLookupRequest): The ids, identifiers and source URIs to resolve.
+        as_of (str): Read the version of the data that was current at this time.
+
+    Returns:
+        InfraLookupResponse: The records that were found and the keys that were not.
+    """
+    keys = {"id": request.ids, "identifier": request.identifiers, "source_uri": request.source_uris}
+    if sum(len(values) for values in keys.values()) > MAX_LOOKUP_KEYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A lookup can resolve at most {MAX_LOOKUP_KEYS} keys."
+        )
+
+    as_of_time = parse_as_of(as_of)
+    snapshot_version(as_of_time)
+    rows, missing = crud.lookup_infras(keys, as_of=as_of_time)
+    items = [InfraBase(**dict(zip(ALL_COLS, row))) for row in rows]
+    return InfraLookupResponse(
+        items=items,
+        missing=InfraLookupRequest(ids=missing["id"], identifiers=missing["identifier"],
+                                   source_uris=missing["source_uri"]),
+        total=len(items)
+    )
 
 @router.get("/infras/{identifier}", response_model=InfraDetail, dependencies=[Depends(verify_api_key)])
-def read_infra(identifier: str):
+def read_infra(identifier: str, request: Request, response: Response,
+               as_of: Optional[str] = Query(None, description=AS_OF_DESCRIPTION)):
     """
     Retrieve the details of a specific infrastructure record by its identifier.
 
     Args:
         identifier (str): The unique identifier of the infrastructure record.
+        as_of (str): Read the version of the data that was current at this time.
 
     Returns:
         InfraDetail: Detailed information about a single infrastructure record.
     """
     try:
-        row = crud.get_infra_detail(identifier)
+        as_of_time = parse_as_of(as_of)
+        etag = make_etag("infra", identifier, version=snapshot_version(as_of_time))
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
+        row = crud.get_infra_detail(identifier, as_of=as_of_time)
         if row is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -98,6 +335,7 @@ def read_infra(identifier: str):
 
         # Convert tuple to InfraDetail using dictionary unpacking
         infra = InfraDetail(**dict(zip(ALL_COLS, row)))
+        set_validators(response, etag)
         return infra
 
     except HTTPException as http_exc:
@@ -112,6 +350,23 @@ def read_infra(identifier: str):
                     the infrastructure record with id '{identifier}'."
         ) from e
 
+@router.post("/cache/refresh", status_code=status.HTTP_200_OK,
+             dependencies=[Depends(verify_api_key)])
+def refresh_cache():
+    """
+    Bring the cached infrastructure data up to the latest version. A versioned snapshot
+    is updated by applying the deltas since the cached version.
+    """
+    try:
+        version = cache_manager.load_data_into_cache()
+        cache_manager.persist_snapshot()
+        return {"detail": "Cache refreshed successfully.", "version": str(version)}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while refreshing the cache."
+        ) from e
+
 @router.post("/cache/clear", status_code=status.HTTP_200_OK, dependencies=[Depends(verify_api_key)])
 def clear_cache():
     """
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.params import Depends
+from ..db import crud
+from ..db.database import cache_manager
+from ..schemas.infrastructure import InfraStats, InfraStatsGroup
+from .infrastructure import make_etag, not_modified, set_validators, verify_api_key
+
+router = APIRouter()
+
+@router.get("/stats", response_model=InfraStats, dependencies=[Depends(verify_api_key)])
+def read_stats(
+        request: Request,
+        response: Response,
+        group_by: str = Query("source_system", description="Comma-separated columns to group \
+                                    by: source_system, location_type_label, city and/or \
+                                    postal_code. Leave empty for the overall totals.")):
+    """
+    Retrieve record counts, geometry coverage and missing values per group, from the
+    summary table precomputed by the pipeline.
+
+    Args:
+        group_by (str): Comma-separated columns to group the statistics by.
+
+    Returns:
+        InfraStats: One entry per group, largest groups first.
+    """
+    columns = [column.strip() for column in group_by.split(",") if column.strip()]
+    invalid = [column for column in columns if column not in crud.STATS_DIMENSIONS]
+    if invalid or len(set(columns)) != len(columns):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid group_by parameter. Must be distinct columns out of: "
+                   f"{', '.join(crud.STATS_DIMENSIONS)}"
+        )
+
+    try:
+        _, version = cache_manager.get_summary()
+    except LookupError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail=str(e)) from e
+    etag = make_etag("stats", tuple(columns), version=version)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+
+    result_columns, rows = crud.get_stats(columns)
+
+    groups = []
+    for row in rows:
+        values = dict(zip(result_columns, row))
+        num_records = values["num_records"]
+        if not num_records:
+            continue
+        null_counts = {column.removeprefix("null_"): count for column, count in values.items()
+                       if column.startswith("null_")}
+        groups.append(InfraStatsGroup(
+            key={column: values[column] for column in columns},
+            num_records=num_records,
+            num_with_geometry=values.get("num_with_geometry", 0),
+            num_with_point=values.get("num_with_point", 0),
+            num_with_polygon=values.get("num_with_polygon", 0),
+            geometry_coverage=values.get("num_with_geometry", 0) / num_records,
+            null_counts=null_counts,
+            null_rates={column: count / num_records for column, count in null_counts.items()},
+        ))
+
+    set_validators(response, etag)
+    return InfraStats(group_by=columns, groups=groups, total=len(groups))
@@ -1 +1,2 @@
-from .infrastructure import InfraBase, InfraDetail, InfraList
+from .infrastructure import (InfraBase, InfraDetail, InfraList, InfraLookupRequest,
+                             InfraLookupResponse, InfraStats, InfraStatsGroup)
@@ -1,5 +1,6 @@
+import math
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 
 class InfraBase(BaseModel):
     id: int
@@ -23,6 +24,21 @@ class InfraBase(BaseModel):
     point: Optional[str] = None
     gml: Optional[str] = None
     geojson: Optional[str] = None
+    centroid_lon: Optional[float] = None
+    centroid_lat: Optional[float] = None
+    bbox_min_lon: Optional[float] = None
+    bbox_min_lat: Optional[float] = None
+    bbox_max_lon: Optional[float] = None
+    bbox_max_lat: Optional[float] = None
+    geojson_simplified: Optional[str] = None
+    geojson_coarse: Optional[str] = None
+
+    @field_validator("centroid_lon", "centroid_lat", "bbox_min_lon", "bbox_min_lat",
+                     "bbox_max_lon", "bbox_max_lat")
+    @classmethod
+    def non_finite_to_none(cls, value: Optional[float]) -> Optional[float]:
+        """JSON has no NaN or infinity, so these are served as null."""
+        return value if value is None or math.isfinite(value) else None
 
 
 class InfraDetail(InfraBase):
@@ -33,3 +49,28 @@ class InfraList(BaseModel):
     total: int = 1
     limit: int = 10
     offset: int = 0
+
+class InfraLookupRequest(BaseModel):
+    ids: list[int] = Field(default_factory=list)
+    identifiers: list[str] = Field(default_factory=list)
+    source_uris: list[str] = Field(default_factory=list)
+
+class InfraLookupResponse(BaseModel):
+    items: list[InfraBase]
+    missing: InfraLookupRequest
+    total: int = 0
+
+class InfraStatsGroup(BaseModel):
+    key: dict[str, Optional[str]] = Field(default_factory=dict)
+    num_records: int
+    num_with_geometry: int = 0
+    num_with_point: int = 0
+    num_with_polygon: int = 0
+    geometry_coverage: float = 0.0
+    null_counts: dict[str, int] = Field(default_factory=dict)
+    null_rates: dict[str, float] = Field(default_factory=dict)
+
+class InfraStats(BaseModel):
+    group_by: list[str]
+    groups: list[InfraStatsGroup]
+    total: int = 0
@@ -0,0 +1,84 @@
+import io
+import json
+import boto3
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from fastapi.testclient import TestClient
+from moto import mock_aws
+from src.db import cache_manager as cache_manager_module
+from src.db.database import cache_manager
+from src.db.snapshot import Snapshot
+from src.main import app
+from src.routers.infrastructure import ALL_COLS
+
+API_KEY = "test-key"
+NUM_ROWS = 50
+BUCKET_NAME = "cji-test-bucket"
+
+def make_table(num_rows=NUM_ROWS):
+    """A small all_infras table with every column of the API."""
+    columns = {column: [f"{column}-{i}" for i in range(num_rows)] for column in ALL_COLS}
+    columns["id"] = list(range(1, num_rows + 1))
+    columns["source_system"] = ["Kampas" if i % 2 else "Terra" for i in range(num_rows)]
+    columns["city"] = [f"City {i % 5}" for i in range(num_rows)]
+    columns["location_name"] = [f"Infrastructuur {i:03d}" for i in range(num_rows)]
+    for column in ("centroid_lon", "bbox_min_lon", "bbox_max_lon"):
+        columns[column] = [4.0 + i / 100 for i in range(num_rows)]
+    for column in ("centroid_lat", "bbox_min_lat", "bbox_max_lat"):
+        columns[column] = [51.0 + i / 100 for i in range(num_rows)]
+    for column in ("geojson", "geojson_simplified", "geojson_coarse"):
+        columns[column] = [json.dumps({"type": "Point", "coordinates": [4.0 + i / 100,
+                                                                         51.0 + i / 100]})
+                           for i in range(num_rows)]
+    return pa.table(columns)
+
+class RecordingSnapshot(Snapshot):
+    """A snapshot that records which geometry columns were loaded."""
+    @classmethod
+    def from_table(cls, table, version):
+        snapshot = super().from_table(table, version)
+        snapshot.loaded_geometry = []
+        loader = snapshot._geometry_loader  # pylint: disable=W0212
+
+        def recording_loader(columns):
+            snapshot.loaded_geometry.extend(columns)
+            return loader(columns)
+        snapshot._geometry_loader = recording_loader  # pylint: disable=W0212
+        return snapshot
+
+@pytest.fixture
+def snapshot():
+    """The snapshot served by the API in the tests."""
+    return RecordingSnapshot.from_table(make_table(), version="v1")
+
+@pytest.fixture
+def client(monkeypatch, snapshot):
+    """A test client for the API serving the snapshot fixture, without S3."""
+    monkeypatch.setenv("API_KEY", API_KEY)
+    monkeypatch.setattr(cache_manager_module, "LOCAL_SNAPSHOT_PATH", "")
+    monkeypatch.setattr(cache_manager, "start_background_load", lambda: None)
+    cache_manager.clear_cache()
+    cache_manager._snapshot = snapshot  # pylint: disable=W0212
+    with TestClient(app, headers={"api-key": API_KEY}) as test_client:
+        yield test_client
+    cache_manager.clear_cache()
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    """A mocked S3 bucket, which the cache manager reads from."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    monkeypatch.setenv("S3_BUCKET_NAME", BUCKET_NAME)
+    monkeypatch.delenv("S3_ENDPOINT_URL", raising=False)
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET_NAME)
+        yield client
+
+def put_parquet(s3_client, key, table):
+    """Write an Arrow table to the mocked bucket as Parquet."""
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    s3_client.put_object(Bucket=BUCKET_NAME, Key=key, Body=buffer.getvalue())
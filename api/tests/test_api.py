@@ -0,0 +1,218 @@
+import json
+import pyarrow as pa
+import pytest
+from src.routers import infrastructure
+from .conftest import BUCKET_NAME, put_parquet
+
+@pytest.mark.parametrize("geometry, loaded", [
+    ("centroid", []),
+    ("simplified", ["geojson_simplified"]),
+    ("coarse", ["geojson_coarse"]),
+])
+def test_infras_only_loads_the_selected_geometry(client, snapshot, geometry, loaded):
+    response = client.get("/api/infras", params={"limit": 5, "geometry": geometry})
+    assert response.status_code == 200
+    assert snapshot.loaded_geometry == loaded
+
+    item = response.json()["items"][0]
+    assert item["geojson"] is not None
+    assert item["point"] is None and item["gml"] is None
+
+def test_infras_full_geometry(client, snapshot):
+    response = client.get("/api/infras", params={"limit": 5, "geometry": "full"})
+    assert response.status_code == 200
+    assert set(snapshot.loaded_geometry) == set(snapshot.geometry_columns)
+    assert response.json()["items"][0]["geojson_coarse"] is not None
+
+def test_infra_detail(client):
+    response = client.get("/api/infras/3")
+    assert response.status_code == 200
+    assert response.json()["id"] == 3
+    assert response.json()["location_name"] == "Infrastructuur 002"
+    assert client.get("/api/infras/999").status_code == 404
+
+def test_lookup_by_natural_key(client):
+    by_identifier = client.get("/api/infras/lookup", params={"identifier": "identifier-4"})
+    assert by_identifier.status_code == 200
+    assert by_identifier.json()["id"] == 5
+
+    by_source_uri = client.get("/api/infras/lookup", params={"source_uri": "source_uri-4"})
+    assert by_source_uri.json() == by_identifier.json()
+    assert client.get("/api/infras/lookup",
+                      params={"identifier": "identifier-999"}).status_code == 404
+
+@pytest.mark.parametrize("params", [{}, {"identifier": "identifier-4",
+                                         "source_uri": "source_uri-4"}])
+def test_lookup_by_natural_key_needs_exactly_one_key(client, params):
+    assert client.get("/api/infras/lookup", params=params).status_code == 400
+
+def test_batch_lookup(client):
+    response = client.post("/api/infras/lookup", json={
+        "ids": [1, 999, 2],
+        "identifiers": ["identifier-9", "unknown"],
+        "source_uris": ["source_uri-19"],
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["id"] for item in body["items"]] == [1, 2, 10, 20]
+    assert body["total"] == 4
+    assert body["missing"] == {"ids": [999], "identifiers": ["unknown"], "source_uris": []}
+
+def test_batch_lookup_is_limited(client, monkeypatch):
+    monkeypatch.setattr(infrastructure, "MAX_LOOKUP_KEYS", 3)
+    assert client.post("/api/infras/lookup",
+                       json={"ids": [1, 2], "identifiers": ["identifier-3"]}).status_code == 200
+    response = client.post("/api/infras/lookup",
+                           json={"ids": [1, 2], "source_uris": ["source_uri-3", "source_uri-4"]})
+    assert response.status_code == 400
+
+def test_requires_api_key(client):
+    assert client.get("/api/infras", headers={"api-key": "wrong"}).status_code == 401
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_large_responses_are_compressed(client, encoding):
+    response = client.get("/api/infras", params={"limit": 50},
+                          headers={"Accept-Encoding": encoding})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == encoding
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert response.headers["etag"].endswith(f'-{encoding}"')
+    assert response.json()["total"] == 50
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get("/api/infras", params={"limit": 1, "geometry": "centroid"},
+                          headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+def test_not_modified(client):
+    response = client.get("/api/infras", params={"limit": 5},
+                          headers={"Accept-Encoding": "identity"})
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "no-cache"
+
+    revalidated = client.get("/api/infras", params={"limit": 5},
+                             headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+    # Other parameters are another resource
+    other = client.get("/api/infras", params={"limit": 6},
+                       headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+    assert other.status_code == 200
+
+def test_not_modified_with_compressed_etag(client):
+    response = client.get("/api/infras/3", headers={"Accept-Encoding": "gzip"})
+    etag = response.headers["etag"]
+
+    revalidated = client.get("/api/infras/3", headers={"If-None-Match": f"W/{etag}",
+                                                       "Accept-Encoding": "gzip"})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+
+def test_not_modified_returns_the_current_etag(client):
+    etag = client.get("/api/infras/3", headers={"Accept-Encoding": "identity"}).headers["etag"]
+    for if_none_match in ("*", f"W/{etag}", f'"other", {etag}'):
+        revalidated = client.get("/api/infras/3", headers={"If-None-Match": if_none_match,
+                                                           "Accept-Encoding": "identity"})
+        assert revalidated.status_code == 304
+        assert revalidated.headers["etag"] == etag
+
+def test_etag_changes_with_the_snapshot_version(client):
+    from src.db.database import cache_manager  # pylint: disable=C0415
+    from .conftest import make_table  # pylint: disable=C0415
+
+    etag = client.get("/api/infras/3").headers["etag"]
+    cache_manager._snapshot = type(cache_manager._snapshot).from_table(  # pylint: disable=W0212
+        make_table(), version="v2")
+    assert client.get("/api/infras/3", headers={"If-None-Match": etag}).status_code == 200
+
+@pytest.fixture
+def streaming(monkeypatch):
+    """Stream every /infras page of more than 10 records, in batches of 7."""
+    from src.routers import infrastructure  # pylint: disable=C0415
+    monkeypatch.setattr(infrastructure, "STREAMING_THRESHOLD", 10)
+    monkeypatch.setattr(infrastructure, "STREAMING_BATCH_SIZE", 7)
+
+@pytest.mark.parametrize("geometry", ["full", "centroid"])
+def test_streamed_infras_match_the_buffered_response(client, monkeypatch, geometry):
+    params = {"limit": 30, "offset": 5, "sort_by": "location_name", "sort_order": "desc",
+              "geometry": geometry}
+    buffered = client.get("/api/infras", params=params)
+    assert buffered.status_code == 200
+
+    from src.db import crud  # pylint: disable=C0415
+    stream_infras, batch_sizes = crud.stream_infras, []
+
+    def recording_stream_infras(**kwargs):
+        for batch in stream_infras(**kwargs):
+            batch_sizes.append(len(batch))
+            yield batch
+    monkeypatch.setattr(crud, "stream_infras", recording_stream_infras)
+    monkeypatch.setattr("src.routers.infrastructure.STREAMING_THRESHOLD", 10)
+    monkeypatch.setattr("src.routers.infrastructure.STREAMING_BATCH_SIZE", 7)
+
+    streamed = client.get("/api/infras", params=params)
+    assert streamed.status_code == 200
+    assert batch_sizes == [7, 7, 7, 7, 2]
+    assert streamed.headers["etag"] == buffered.headers["etag"]
+    assert streamed.json() == buffered.json()
+    assert streamed.json()["total"] == 30
+    assert streamed.json()["items"][0]["location_name"] == "Infrastructuur 044"
+
+def test_streamed_infras_without_nan(client, monkeypatch, streaming):  # pylint: disable=W0613
+    from src.db.database import cache_manager  # pylint: disable=C0415
+    from .conftest import RecordingSnapshot, make_table  # pylint: disable=C0415
+
+    table = make_table()
+    values = [[float("nan"), float("inf"), None][i % 3] if i < 12 else 4.0 for i in range(50)]
+    table = table.set_column(table.column_names.index("centroid_lon"), "centroid_lon",
+                             pa.array(values, type=pa.float64()))
+    monkeypatch.setattr(cache_manager, "_snapshot", RecordingSnapshot.from_table(table, "v2"))
+
+    params = {"limit": 20, "geometry": "full"}
+    streamed = client.get("/api/infras", params=params)
+    assert streamed.status_code == 200
+    assert [item["centroid_lon"] for item in streamed.json()["items"]][:13] == [None] * 12 + [4.0]
+
+    monkeypatch.setattr("src.routers.infrastructure.STREAMING_THRESHOLD", 1000)
+    assert streamed.json() == client.get("/api/infras", params=params).json()
+    assert client.get("/api/infras/1").json()["centroid_lon"] is None
+
+def test_streamed_infras_not_found(client, streaming):  # pylint: disable=W0613
+    response = client.get("/api/infras", params={"limit": 30, "offset": 100})
+    assert response.status_code == 404
+
+def test_streamed_infras_not_modified(client, streaming):  # pylint: disable=W0613
+    etag = client.get("/api/infras", params={"limit": 30}).headers["etag"]
+    revalidated = client.get("/api/infras", params={"limit": 30},
+                             headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+
+def _summary(num_records):
+    return pa.table({"source_system": ["Kampas", "Terra"],
+                     "location_type_label": ["Gebouw", "Gebouw"],
+                     "city": ["Gent", "Gent"], "postal_code": ["9000", "9000"],
+                     "num_records": num_records, "num_with_geometry": [1, 1],
+                     "num_with_point": [1, 0], "num_with_polygon": [0, 1],
+                     "null_street": [0, 1]})
+
+def test_stats_without_a_summary(client, s3_client):  # pylint: disable=W0613
+    response = client.get("/api/stats")
+    assert response.status_code == 503
+
+def test_stats_are_refreshed_with_the_snapshot(client, s3_client, snapshot):
+    # The pointer names the cached version, so only the summary changes on a refresh
+    s3_client.put_object(Bucket=BUCKET_NAME, Key="current.json", Body=json.dumps(
+        {"version": snapshot.version, "key": "all_infras_final.parquet", "history": []}))
+    put_parquet(s3_client, "infras_summary.parquet", _summary([3, 2]))
+
+    response = client.get("/api/stats")
+    assert response.status_code == 200
+    assert [group["num_records"] for group in response.json()["groups"]] == [3, 2]
+
+    put_parquet(s3_client, "infras_summary.parquet", _summary([3, 7]))
+    assert client.post("/api/cache/refresh").status_code == 200
+    revalidated = client.get("/api/stats", headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 200
+    assert [group["num_records"] for group in revalidated.json()["groups"]] == [7, 3]
@@ -0,0 +1,71 @@
+import os
+import threading
+import pyarrow as pa
+import pytest
+from src.db import cache_manager as cache_manager_module
+from src.db.cache_manager import CacheManager
+from .conftest import RecordingSnapshot, make_table
+
+@pytest.fixture
+def local_snapshot_path(monkeypatch, tmp_path):
+    path = str(tmp_path / "snapshot.arrow")
+    monkeypatch.setattr(cache_manager_module, "LOCAL_SNAPSHOT_PATH", path)
+    return path
+
+@pytest.fixture
+def s3_geometry(monkeypatch):
+    """Serve the geometry streamed from S3 from a table, in batches of 7 rows."""
+    table, streamed = make_table(), []
+
+    def stream_geometry(_, s3_uri, geometry_columns, batch_size):  # pylint: disable=W0613
+        streamed.append((s3_uri, geometry_columns))
+        yield from table.select(["id", *geometry_columns]).to_batches(max_chunksize=7)
+    monkeypatch.setattr(CacheManager, "_stream_geometry", stream_geometry)
+    monkeypatch.setenv("S3_BUCKET_NAME", "bucket")
+    return streamed
+
+def _cache_manager(snapshot):
+    manager = CacheManager()
+    manager._snapshot = snapshot  # pylint: disable=W0212
+    manager._pointer = {"version": snapshot.version, "key": "snapshots/v1/all_infras.parquet",
+                        "history": []}
+    return manager
+
+def test_persist_streams_the_geometry_that_is_not_loaded(local_snapshot_path, s3_geometry):
+    table = make_table()
+    snapshot = RecordingSnapshot.from_table(table, version="v1")
+    snapshot.load_geometry(["geojson_coarse"])
+    _cache_manager(snapshot).persist_snapshot()
+
+    # Persisting does not load the other geometry into the snapshot
+    assert snapshot.loaded_geometry == ["geojson_coarse"]
+    assert s3_geometry == [("s3://bucket/snapshots/v1/all_infras.parquet",
+                            ["point", "gml", "geojson", "geojson_simplified"])]
+
+    manager = CacheManager()
+    assert manager.load_local_snapshot()
+    restored = manager.get_snapshot()
+    assert restored.version == "v1"
+    assert restored.table.to_pylist() == table.to_pylist()
+
+def test_persist_fails_on_mismatching_geometry(local_snapshot_path, s3_geometry):
+    snapshot = RecordingSnapshot.from_table(make_table(40), version="v1")
+    with pytest.raises(RuntimeError):
+        _cache_manager(snapshot).persist_snapshot()
+    assert os.listdir(os.path.dirname(local_snapshot_path)) == []
+
+def test_concurrent_persists(local_snapshot_path):
+    snapshots = [RecordingSnapshot.from_table(make_table(), version=f"v{i}") for i in range(8)]
+    for snapshot in snapshots:
+        snapshot.load_geometry()
+    managers = [_cache_manager(snapshot) for snapshot in snapshots]
+    threads = [threading.Thread(target=manager.persist_snapshot) for manager in managers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert pa.ipc.open_file(local_snapshot_path).read_all().num_rows == 50
+    assert os.listdir(os.path.dirname(local_snapshot_path)) == ["snapshot.arrow"]
+    assert all(manager._persisted_version is not None  # pylint: disable=W0212
+               for manager in managers)
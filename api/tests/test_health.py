@@ -0,0 +1,104 @@
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from src.db import cache_manager as cache_manager_module
+from src.db.cache_manager import CacheManager
+from src.db.database import cache_manager
+from src.main import app
+from .conftest import API_KEY, RecordingSnapshot, make_table
+
+@pytest.fixture
+def s3_load(monkeypatch, tmp_path):
+    """
+    Replace the load from S3 with one that blocks until released, then caches a
+    snapshot of version "v2" or raises the given error.
+    """
+    monkeypatch.setenv("API_KEY", API_KEY)
+    monkeypatch.setattr(cache_manager_module, "LOCAL_SNAPSHOT_PATH",
+                        str(tmp_path / "snapshot.arrow"))
+    monkeypatch.setattr(cache_manager, "_load_error", None)
+    monkeypatch.setattr(cache_manager, "_persisted_version", None)
+    cache_manager.clear_cache()
+
+    load = {"started": threading.Event(), "release": threading.Event(), "error": None}
+
+    def load_data_into_cache():
+        load["started"].set()
+        assert load["release"].wait(timeout=10)
+        if load["error"] is not None:
+            raise load["error"]
+        snapshot = RecordingSnapshot.from_table(make_table(), version="v2")
+        snapshot.load_geometry()
+        cache_manager._snapshot = snapshot  # pylint: disable=W0212
+        cache_manager._snapshot_source = "s3"  # pylint: disable=W0212
+        cache_manager._pointer = _pointer("v2")  # pylint: disable=W0212
+        return snapshot.version
+    monkeypatch.setattr(cache_manager, "load_data_into_cache", load_data_into_cache)
+
+    threads = []
+    start_background_load = cache_manager.start_background_load
+    monkeypatch.setattr(cache_manager, "start_background_load",
+                        lambda: threads.append(start_background_load()))
+    load["threads"] = threads
+    yield load
+    load["release"].set()
+    cache_manager.clear_cache()
+
+def _pointer(version):
+    return {"version": version, "key": f"snapshots/{version}/all_infras.parquet",
+            "history": []}
+
+def _finish(load):
+    load["release"].set()
+    for thread in load["threads"]:
+        thread.join(timeout=10)
+
+def _persist_local_snapshot(version):
+    snapshot = RecordingSnapshot.from_table(make_table(), version=version)
+    snapshot.load_geometry()
+    manager = CacheManager()
+    manager._snapshot = snapshot  # pylint: disable=W0212
+    manager._pointer = _pointer(version)  # pylint: disable=W0212
+    manager.persist_snapshot()
+
+def test_ready_once_the_snapshot_is_loaded(s3_load):
+    with TestClient(app, headers={"api-key": API_KEY}) as client:
+        assert s3_load["started"].wait(timeout=10)
+        assert client.get("/health").json() == {"status": "ok"}
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
+        assert response.json()["loading"] is True
+
+        _finish(s3_load)
+        assert client.get("/health").status_code == 200
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json() == {"ready": True, "version": "v2", "source": "s3",
+                                   "loading": False, "error": None}
+
+def test_local_snapshot_is_served_while_loading_from_s3(s3_load):
+    _persist_local_snapshot("v1")
+    with TestClient(app, headers={"api-key": API_KEY}) as client:
+        assert s3_load["started"].wait(timeout=10)
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["source"] == "local"
+        assert response.json()["loading"] is True
+
+        detail = client.get("/api/infras/3")
+        assert detail.status_code == 200
+        assert detail.json()["location_name"] == "Infrastructuur 002"
+
+        _finish(s3_load)
+        assert client.get("/ready").json()["version"] == "v2"
+
+def test_failed_load_is_reported(s3_load):
+    s3_load["error"] = RuntimeError("The bucket is unreachable")
+    with TestClient(app, headers={"api-key": API_KEY}) as client:
+        _finish(s3_load)
+        assert client.get("/health").status_code == 200
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["loading"] is False
+        assert response.json()["error"] == "The bucket is unreachable"
@@ -0,0 +1,104 @@
+import os
+import sys
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pytest
+from src.db.snapshot import KeyIndex, Snapshot
+from .conftest import RecordingSnapshot, make_table
+
+# The deltas are written by the pipeline's snapshots module, which only needs pyarrow,
+# numpy and pandas
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "pipeline"))
+snapshots = pytest.importorskip("cji_pipeline.snapshots")
+
+def _next_version(table):
+    """Change, remove, duplicate and add rows of a pipeline output, in a new order."""
+    source_uris = table.column("source_uri").to_pylist()
+    cities = [f"{city} (renamed)" if i % 7 == 0 else city
+              for i, city in enumerate(table.column("city").to_pylist())]
+    geojson = ['{"type": "Point", "coordinates": [5.0, 52.0]}' if i % 11 == 0 else value
+               for i, value in enumerate(table.column("geojson").to_pylist())]
+    table = table.set_column(table.column_names.index("city"), "city", pa.array(cities))
+    table = table.set_column(table.column_names.index("geojson"), "geojson", pa.array(geojson))
+
+    # Drop every fifth row, repeat a source_uri and add new ones
+    table = table.filter(pa.array([i % 5 != 3 for i in range(table.num_rows)]))
+    added = make_table(4).set_column(
+        table.column_names.index("source_uri"), "source_uri",
+        pa.array([source_uris[0], "new-1", "new-2", "new-3"]))
+    table = pa.concat_tables([added.cast(table.schema), table])
+    return table.take(pc.sort_indices(table, [("location_name", "descending")]))
+
+def _rows(table):
+    return table.sort_by("id").to_pylist()
+
+def _loader(table):
+    """A geometry loader reading from the file of a version, here a table."""
+    return lambda columns: table.select(["id", *columns])
+
+def test_key_index():
+    index = KeyIndex(pd.Series(["a", None, "b", "a", "c"]))
+    assert len(index) == 3
+    assert index.get("b") == 2
+    assert index.get("missing") is None
+    assert index.get(1) is None
+    assert index.get_many(["c", "missing", "b"]) == [4, None, 2]
+    assert index.get_many([]) == []
+
+def test_key_index_first_duplicate_wins():
+    index = KeyIndex(pd.Series([7, 3, 7, 3]))
+    assert index.get(7) == 0
+    assert index.get_many([3, 7]) == [1, 0]
+
+    table = make_table(3)
+    table = table.set_column(table.column_names.index("identifier"), "identifier",
+                             pa.array(["x", "y", "x"]))
+    snapshot = Snapshot.from_table(table, "v1")
+    assert snapshot.lookup("identifier", "x")[0] == 1
+
+def test_deltas_reproduce_the_next_version():
+    first, delta = snapshots.version_table(make_table())
+    assert delta is None
+    snapshot = Snapshot.from_table(first, "v1")
+
+    previous = first
+    for version in ("v2", "v3"):
+        table, delta = snapshots.version_table(_next_version(previous), previous)
+        assert set(delta.column("change").to_pylist()) == {"added", "changed", "removed"}
+
+        snapshot = snapshot.apply_delta(delta, version, geometry_loader=_loader(table))
+        assert snapshot.version == version
+        assert _rows(snapshot.core) == _rows(table.drop_columns(snapshot.geometry_columns))
+        assert _rows(snapshot.table) == _rows(table)
+        previous = table
+
+def test_unchanged_rows_keep_their_id():
+    first, _ = snapshots.version_table(make_table())
+    second, delta = snapshots.version_table(first.take(pa.array(range(49, -1, -1))), first)
+
+    assert delta.num_rows == 0
+    assert _rows(second) == _rows(first)
+    snapshot = Snapshot.from_table(first, "v1").apply_delta(delta, "v2", _loader(second))
+    assert _rows(snapshot.table) == _rows(first)
+
+def test_apply_delta_keeps_the_geometry_unloaded():
+    first, _ = snapshots.version_table(make_table())
+    second, delta = snapshots.version_table(_next_version(first), first)
+    snapshot = RecordingSnapshot.from_table(first, "v1")
+    snapshot.load_geometry(["geojson_coarse"])
+
+    loaded = []
+    def loader(columns):
+        loaded.extend(columns)
+        return second.select(["id", *columns])
+    updated = snapshot.apply_delta(delta, "v2", geometry_loader=loader)
+
+    # Neither version loads the geometry it does not need
+    assert snapshot.loaded_geometry == ["geojson_coarse"]
+    assert updated.loaded_table.column_names == updated.core.column_names
+    assert not loaded
+
+    updated.load_geometry(["geojson"])
+    assert loaded == ["geojson"]
+    assert updated.relation(["geojson"]).column("geojson").equals(second.column("geojson"))
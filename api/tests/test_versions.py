@@ -0,0 +1,101 @@
+import json
+import pyarrow as pa
+import pyarrow.compute as pc
+import pytest
+from src.db.cache_manager import CacheManager
+from .conftest import BUCKET_NAME, RecordingSnapshot, make_table, put_parquet
+
+V1_KEY = "snapshots/v1/all_infras.parquet"
+V2_KEY = "snapshots/v2/all_infras.parquet"
+V2_DELTA_KEY = "snapshots/v2/delta.parquet"
+
+def _versions():
+    """Version v1, and v2 with id 3 renamed, id 5 removed and id 51 added."""
+    v1 = make_table()
+    names = [f"{name} (v2)" if i == 2 else name
+             for i, name in enumerate(v1.column("location_name").to_pylist())]
+    v2 = v1.set_column(v1.column_names.index("location_name"), "location_name", pa.array(names))
+    v2 = pa.concat_tables([v2.filter(pc.not_equal(v2.column("id"), 5)),
+                           make_table(51).slice(50)])
+
+    upserts = v2.filter(pc.is_in(v2.column("id"), value_set=pa.array([3, 51])))
+    upserts = upserts.append_column("change", pa.array(["changed", "added"]))
+    removed = pa.table({field.name: pa.nulls(1, type=field.type) for field in upserts.schema})
+    removed = removed.set_column(0, "id", pa.array([5], type=pa.int64()))
+    removed = removed.set_column(removed.column_names.index("change"), "change",
+                                 pa.array(["removed"]))
+    return v1, v2, pa.concat_tables([upserts, removed])
+
+@pytest.fixture
+def versioned(client, s3_client, monkeypatch):  # pylint: disable=W0613
+    """
+    Two versions on S3: the client serves v1, the pointer names v2 with a delta.
+    Snapshots and geometry are read from the tables instead of through DuckDB.
+    """
+    v1, v2, delta = _versions()
+    put_parquet(s3_client, V2_DELTA_KEY, delta)
+    history = [
+        {"version": "v2", "key": V2_KEY, "delta_key": V2_DELTA_KEY, "previous_version": "v1",
+         "created_at": "2026-10-02T00:00:00+00:00"},
+        {"version": "v1", "key": V1_KEY, "delta_key": None, "previous_version": None,
+         "created_at": "2026-10-01T00:00:00+00:00"},
+    ]
+    s3_client.put_object(Bucket=BUCKET_NAME, Key="current.json",
+                         Body=json.dumps({**history[0], "history": history}))
+
+    tables = {V1_KEY: v1, V2_KEY: v2}
+    loads = {"snapshots": [], "geometry": []}
+
+    def load_snapshot(_, session, s3_key, version):  # pylint: disable=W0613
+        loads["snapshots"].append(s3_key)
+        return RecordingSnapshot.from_table(tables[s3_key], version)
+
+    def load_geometry(_, s3_uri, columns):
+        loads["geometry"].append((s3_uri, columns))
+        return tables[s3_uri.removeprefix(f"s3://{BUCKET_NAME}/")].select(["id", *columns])
+    monkeypatch.setattr(CacheManager, "_load_snapshot", load_snapshot)
+    monkeypatch.setattr(CacheManager, "_load_geometry", load_geometry)
+    return loads
+
+def test_refresh_applies_the_delta(client, versioned):
+    response = client.post("/api/cache/refresh")
+    assert response.status_code == 200
+    assert response.json()["version"] == "v2"
+    assert versioned == {"snapshots": [], "geometry": []}
+
+    items = client.get("/api/infras", params={"limit": 100, "geometry": "centroid"}).json()
+    assert [item["id"] for item in items["items"]] == [i for i in range(1, 52) if i != 5]
+    assert versioned["geometry"] == []
+
+    assert client.get("/api/infras/3").json()["location_name"] == "Infrastructuur 002 (v2)"
+    assert client.get("/api/infras/5").status_code == 404
+    assert client.get("/api/infras/51").status_code == 200
+    assert versioned["geometry"] == [(f"s3://{BUCKET_NAME}/{V2_KEY}",
+                                      ["point", "gml", "geojson", "geojson_simplified",
+                                       "geojson_coarse"])]
+
+def test_as_of_reads_an_earlier_version(client, versioned):
+    client.post("/api/cache/refresh")
+
+    detail = client.get("/api/infras/3", params={"as_of": "2026-10-01T12:00:00"})
+    assert detail.status_code == 200
+    assert detail.json()["location_name"] == "Infrastructuur 002"
+    assert client.get("/api/infras/5", params={"as_of": "2026-10-01"}).status_code == 200
+    assert client.get("/api/infras/5", params={"as_of": "2026-10-02"}).status_code == 404
+
+    page = client.get("/api/infras", params={"limit": 100, "as_of": "2026-10-01T12:00:00"})
+    assert page.json()["total"] == 50
+    assert page.headers["etag"] != client.get("/api/infras", params={"limit": 100}).headers["etag"]
+
+    # The earlier version is loaded once and kept
+    client.get("/api/infras/4", params={"as_of": "2026-10-01T12:00:00"})
+    assert versioned["snapshots"] == [V1_KEY]
+
+def test_as_of_before_the_retained_versions(client, versioned):  # pylint: disable=W0613
+    client.post("/api/cache/refresh")
+    assert client.get("/api/infras/3", params={"as_of": "2026-09-01"}).status_code == 404
+    assert client.get("/api/infras", params={"as_of": "2026-09-01"}).status_code == 404
+
+@pytest.mark.parametrize("path", ["/api/infras", "/api/infras/3"])
+def test_invalid_as_of(client, path):
+    assert client.get(path, params={"as_of": "yesterday"}).status_code == 400
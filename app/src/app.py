@@ -1,6 +1,8 @@
 import re
 import os
 import json
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
 import streamlit as st
 import pandas as pd
@@ -14,37 +16,116 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'), overrid
 
 # Constants
 API_BASE_URL = os.getenv("API_BASE_URL")
+API_STATS_URL = os.getenv("API_STATS_URL",
+                          API_BASE_URL.rsplit("/", 1)[0] + "/stats" if API_BASE_URL else None)
 API_KEY = os.getenv("API_KEY")
-PAGE_LENGTH = 20000
+PAGE_SIZE = int(os.getenv("APP_PAGE_SIZE", "1000"))
 MAX_DISPLAY_RECORDS = 1000
+CACHE_TTL_SECONDS = 60
+VALIDATOR_CACHE_SIZE = 4
 
 # Set the wide layout as default
 st.set_page_config(layout="wide")
 
-@st.cache_data
-def fetch_data(limit=10, offset=0, filters=None, sort_by="location_name", sort_order="asc"):
-    """Fetch data from the API"""
+@st.cache_resource
+def get_http_session():
+    """Shared HTTP session, so connections to the API are reused across reruns."""
+    session = requests.Session()
+    session.headers.update({
+        "accept": "application/json",
+        "api-key": API_KEY
+    })
+    return session
+
+class ValidatorCache:
+    """
+    The most recent responses from the API by request, kept together with their ETag
+    so they can be revalidated. Shared by all sessions, so it holds at most max_size
+    responses.
+    """
+    def __init__(self, max_size=VALIDATOR_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached ETag and data for a request, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, etag, data):
+        """Cache a response, evicting the least recently used one beyond max_size."""
+        with self._lock:
+            self._entries[key] = {"etag": etag, "data": data}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+@st.cache_resource
+def get_validator_cache():
+    """Responses from the API by request, kept together with their ETag."""
+    return ValidatorCache()
+
+def get_json(url, params, report_errors=True):
+    """
+    GET a JSON document from the API. The previous response is revalidated with
+    its ETag, so unchanged data costs a 304 only.
+    """
+    validator_cache = get_validator_cache()
+    cache_key = json.dumps([url, params], sort_keys=True)
+    cached = validator_cache.get(cache_key)
+
+    headers = {}
+    if cached:
+        headers["If-None-Match"] = cached["etag"]
+
+    response = get_http_session().get(url, params=params, headers=headers, timeout=None)
+
+    if response.status_code == 304 and cached:
+        return cached["data"]
+    if response.status_code == 200:
+        data = response.json()
+        etag = response.headers.get("ETag")
+        if etag:
+            validator_cache.put(cache_key, etag, data)
+        return data
+    else:
+        if report_errors:
+            st.error(f"Failed to fetch data: {response.status_code}")
+        return None
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS)
+def fetch_data(limit=10, offset=0, filters=None, sort_by="location_name", sort_order="asc",
+               geometry="simplified"):
+    """
+    Fetch data from the API, revalidating it once the short-lived cache expires.
+    The map only needs the simplified outlines, not the full resolution geometry.
+    """
     params = {
         "limit": limit,
         "offset": offset,
         "sort_by": sort_by,
-        "sort_order": sort_order
+        "sort_order": sort_order,
+        "geometry": geometry
     }
     if filters:
         params["filters"] = filters
-
-    headers = {
-        "accept": "application/json",
-        "api-key": API_KEY
-    }
-
-    response = requests.get(API_BASE_URL, params=params, headers=headers, timeout=None)
-
-    if response.status_code == 200:
-        return response.json()
-    else:
-        st.error(f"Failed to fetch data: {response.status_code}")
+    return get_json(API_BASE_URL, params)
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS)
+def fetch_stats(group_by):
+    """
+    Fetch the record counts per group over the whole dataset, as precomputed by the pipeline.
+    Returns a Series indexed by the group_by column, or None if the statistics are unavailable.
+    """
+    data = get_json(API_STATS_URL, {"group_by": group_by}, report_errors=False)
+    if not data:
         return None
+    return pd.Series({group["key"][group_by]: group["num_records"] for group in data["groups"]
+                      if group["key"][group_by] is not None}, dtype="int64")
 
 def apply_filters(df):
     """Filter the DataFrame based on sidebar filters"""
@@ -72,22 +153,26 @@ def display_table_view(df):
     df = df.fillna('').astype(str)
     st.dataframe(df, use_container_width=True, height=600)
 
-def display_chart_view(df):
-    """Create the chart view."""
-    if not df.empty:
-        col1, col2 = st.columns(2)
+def display_chart_view():
+    """
+    Create the chart view. The counts come from the statistics endpoint, which covers
+    the whole dataset without downloading it.
+    """
+    source_system_counts = fetch_stats("source_system")
+    location_type_counts = fetch_stats("location_type_label")
+    if source_system_counts is None or location_type_counts is None:
+        st.write("Geen gegevens beschikbaar om de grafieken weer te geven.")
+        return
+
+    col1, col2 = st.columns(2)
 
-        with col1:
-            st.write("Aantal records per bron")
-            source_system_counts = df["Bronsysteem"].value_counts().sort_values(ascending=True)
-            st.bar_chart(source_system_counts)
+    with col1:
+        st.write("Aantal records per bron")
+        st.bar_chart(source_system_counts.sort_values(ascending=True))
 
-        with col2:
-            st.write("Aantal records per type")
-            location_type_counts = df["Locatietype"].value_counts().sort_values(ascending=True)
-            st.bar_chart(location_type_counts)
-    else:
-        st.write("Geen gegevens beschikbaar om de grafieken weer te geven.")
+    with col2:
+        st.write("Aantal records per type")
+        st.bar_chart(location_type_counts.sort_values(ascending=True))
 
 def display_map_view(df):
     """Create the map view."""
@@ -150,10 +235,24 @@ def display_map_view(df):
 
 def main():
     """Main application logic."""
-    # Fetch data
-    data = fetch_data(limit=PAGE_LENGTH, offset=0, sort_by="location_name", sort_order="asc")
+    st.title("Cultuur en Jeugdinfrastructuur Dashboard")
 
-    if data:
+    # Sidebar view selection
+    view = st.sidebar.radio("Kies weergave",
+                            ["Tabelweergave", "Kaartweergave", "Grafiekenweergave"])
+
+    # The charts are drawn from the statistics, without fetching the records
+    if view == "Grafiekenweergave":
+        display_chart_view()
+        return
+
+    # The table and the map show one page of records at a time
+    page = st.sidebar.number_input("Pagina", min_value=1, value=1, step=1)
+    data = fetch_data(limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE, sort_by="location_name",
+                      sort_order="asc",
+                      geometry="simplified" if view == "Kaartweergave" else "centroid")
+
+    if data and data["items"]:
         # Data filtering and cleaning for UI display
         df = pd.DataFrame(data["items"])
         df = df[["location_name", "location_type_label", "street", "house_number", "postal_code",
@@ -175,15 +274,8 @@ def main():
         # Apply sidebar filters
         df_filtered = apply_filters(df)
 
-        # Sidebar view selection
-        view = st.sidebar.radio("Kies weergave",
-                                ["Tabelweergave", "Kaartweergave", "Grafiekenweergave"])
-
-        # Streamlit UI Title and Result Summary
-        st.title("Cultuur en Jeugdinfrastructuur Dashboard")
-        total_records = data.get("total", 0)
-        filtered_records = len(df_filtered)
-        st.markdown(f"### Resultaten: {filtered_records} van {total_records}")
+        # Result Summary
+        st.markdown(f"### Resultaten: {len(df_filtered)} van {len(df)} (pagina {page})")
 
         # Display the selected view
         if view == "Tabelweergave":
@@ -192,9 +284,6 @@ def main():
         elif view == "Kaartweergave":
             display_map_view(df_filtered)
 
-        elif view == "Grafiekenweergave":
-            display_chart_view(df_filtered)
-
     else:
         st.write("Geen gegevens gevonden.")
 
@@ -0,0 +1,4 @@
+"""
+Benchmark suite for the CJI stack: synthetic data generation, pipeline transform
+benchmarks and an API load-test harness. Run with `python -m benchmarks --help`.
+"""
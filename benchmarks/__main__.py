@@ -0,0 +1,70 @@
+import os
+import argparse
+from . import synthetic
+from .results import DEFAULT_RESULTS_DIR, save_results, load_previous, compare, print_results
+from ._paths import REPO_ROOT
+
+DATA_DIR = os.path.join(REPO_ROOT, "benchmarks", ".data")
+
+def run_pipeline(args):
+    """Benchmark the pipeline transforms for every requested size."""
+    from . import pipeline_bench  # pylint: disable=C0415
+
+    results = []
+    for size in args.sizes:
+        bindings = synthetic.load_or_generate(size, seed=args.seed, data_dir=DATA_DIR)
+        size_results, _ = pipeline_bench.run(bindings, repeat=args.repeat)
+        print_results(size_results)
+        results.extend(size_results)
+    return results
+
+def run_api(args):
+    """Load test the API against a synthetic all_infras snapshot."""
+    from . import pipeline_bench, api_bench  # pylint: disable=C0415
+
+    bindings = synthetic.load_or_generate(args.rows, seed=args.seed, data_dir=DATA_DIR)
+    all_infras_table = pipeline_bench.build_all_infras(pipeline_bench.add_geometry(bindings))
+    results = api_bench.run(all_infras_table, num_requests=args.requests,
+                            concurrency=args.concurrency, seed=args.seed)
+    print_results(results)
+    return results
+
+def run_startup(args):
+    """Measure the time until the API answers its first requests after launch."""
+    from . import pipeline_bench, startup_bench  # pylint: disable=C0415
+
+    bindings = synthetic.load_or_generate(args.rows, seed=args.seed, data_dir=DATA_DIR)
+    all_infras_table = pipeline_bench.build_all_infras(pipeline_bench.add_geometry(bindings))
+    results = startup_bench.run(all_infras_table, repeat=args.repeat)
+    print_results(results)
+    return results
+
+SUITES = {"pipeline": run_pipeline, "api": run_api, "startup": run_startup}
+
+def main():
+    """Run one or all benchmark suites, store the results and compare with the last run."""
+    parser = argparse.ArgumentParser(description="CJI benchmark suite")
+    parser.add_argument("suite", choices=[*SUITES, "all"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000],
+                        help="Number of synthetic rows for the pipeline benchmarks "
+                             "(e.g. 10000 100000 1000000)")
+    parser.add_argument("--rows", type=int, default=50_000,
+                        help="Number of synthetic rows served by the API (api and startup)")
+    parser.add_argument("--requests", type=int, default=500,
+                        help="Number of requests per API scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR)
+    args = parser.parse_args()
+
+    suites = list(SUITES) if args.suite == "all" else [args.suite]
+    for suite in suites:
+        print(f"== {suite} ==")
+        results = SUITES[suite](args)
+        path = save_results(suite, results, args.results_dir)
+        print(f"Results written to {path}")
+        print(compare(results, load_previous(suite, args.results_dir, exclude=path)))
+
+if __name__ == "__main__":
+    main()
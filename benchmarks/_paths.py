@@ -0,0 +1,14 @@
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PIPELINE_DIR = os.path.join(REPO_ROOT, "pipeline")
+API_DIR = os.path.join(REPO_ROOT, "api")
+
+def add_to_path(*directories):
+    """
+    Make the pipeline (cji_pipeline) and/or API (src) packages importable.
+    """
+    for directory in directories:
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
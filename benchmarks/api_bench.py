@@ -0,0 +1,146 @@
+"""
+Local load-test harness for /api/infras and /api/infras/{id}.
+
+The API runs in-process under uvicorn, against a moto server that stands in for S3.
+"""
+import io
+import os
+import time
+import socket
+import random
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+import httpx
+import pyarrow.parquet as pq
+from ._paths import API_DIR, add_to_path
+from .results import summarize_latencies
+
+BUCKET_NAME = "cji-benchmark"
+PARQUET_KEY = "all_infras_final.parquet"
+API_KEY = "benchmark"
+
+def free_port():
+    """Return a free TCP port on localhost."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@contextmanager
+def local_s3(table):
+    """
+    Start a moto S3 server holding the given all_infras table and point the API's
+    environment variables at it.
+    """
+    from moto.server import ThreadedMotoServer  # pylint: disable=C0415
+
+    port = free_port()
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    endpoint_url = f"http://127.0.0.1:{port}"
+
+    os.environ.update({
+        "AWS_ACCESS_KEY_ID": "benchmark",
+        "AWS_SECRET_ACCESS_KEY": "benchmark",
+        "AWS_REGION": "us-east-1",
+        "S3_ENDPOINT_URL": endpoint_url,
+        "S3_BUCKET_NAME": BUCKET_NAME,
+        "S3_PARQUET_KEY": PARQUET_KEY,
+        "API_KEY": API_KEY,
+    })
+
+    try:
+        s3_client = boto3.client("s3", endpoint_url=endpoint_url, region_name="us-east-1")
+        s3_client.create_bucket(Bucket=BUCKET_NAME)
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer)
+        buffer.seek(0)
+        s3_client.upload_fileobj(buffer, BUCKET_NAME, PARQUET_KEY)
+        yield endpoint_url
+    finally:
+        server.stop()
+
+@contextmanager
+def running_api():
+    """Run the FastAPI app under uvicorn in a background thread and yield its base URL."""
+    import uvicorn  # pylint: disable=C0415
+
+    add_to_path(API_DIR)
+    from src.main import app  # pylint: disable=C0415,E0401
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("The API failed to start")
+        time.sleep(0.05)
+
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+def _worker(base_url, paths):
+    latencies = []
+    errors = 0
+    response_bytes = 0
+    with httpx.Client(base_url=base_url, headers={"api-key": API_KEY}, timeout=60) as client:
+        for path in paths:
+            start = time.perf_counter()
+            response = client.get(path)
+            latencies.append(time.perf_counter() - start)
+            response_bytes += len(response.content)
+            if response.status_code != 200:
+                errors += 1
+    return latencies, errors, response_bytes
+
+def load_test(base_url, name, paths, concurrency):
+    """
+    Issue the given request paths spread over concurrency workers and summarize
+    throughput and latency percentiles.
+    """
+    chunks = [paths[i::concurrency] for i in range(concurrency)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(lambda chunk: _worker(base_url, chunk), chunks))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for outcome in outcomes for latency in outcome[0]]
+    return {
+        "name": name,
+        "concurrency": concurrency,
+        "requests_per_s": round(len(paths) / elapsed, 1),
+        "errors": sum(outcome[1] for outcome in outcomes),
+        "avg_response_bytes": int(sum(outcome[2] for outcome in outcomes) / max(len(paths), 1)),
+        **summarize_latencies(latencies),
+    }
+
+def run(all_infras_table, num_requests=500, concurrency=8, seed=42):
+    """
+    Run the list and detail scenarios against an API serving all_infras_table.
+    """
+    rng = random.Random(seed)
+    num_rows = all_infras_table.num_rows
+    scenarios = {
+        "list_infras_limit_100": [
+            f"/api/infras?limit=100&offset={rng.randrange(max(num_rows - 100, 1))}"
+            for _ in range(num_requests)],
+        "list_infras_limit_5000": [
+            f"/api/infras?limit=5000&offset={rng.randrange(max(num_rows - 5000, 1))}"
+            for _ in range(max(num_requests // 10, 1))],
+        "infra_detail": [f"/api/infras/{rng.randint(1, num_rows)}" for _ in range(num_requests)],
+    }
+
+    results = []
+    with local_s3(all_infras_table), running_api() as base_url:
+        # Warm up connections and the snapshot cache
+        _worker(base_url, ["/api/infras?limit=1", "/api/infras/1"])
+        for name, paths in scenarios.items():
+            result = load_test(base_url, name, paths, concurrency)
+            result["rows"] = num_rows
+            results.append(result)
+    return results
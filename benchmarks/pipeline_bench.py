@@ -0,0 +1,125 @@
+"""
+Benchmarks for the pipeline transforms: the geometry conversion, the all_infras SQL
+and Parquet round trips.
+"""
+import io
+import os
+import time
+import tempfile
+import logging
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from ._paths import PIPELINE_DIR, add_to_path
+
+add_to_path(PIPELINE_DIR)
+
+# pylint: disable=C0413
+from cji_pipeline.assets import ALL_INFRAS_SQL, SOURCE_SYSTEM_MAPPING, split_camel_case
+from cji_pipeline.geometry import (DERIVED_GEOMETRY_COLUMNS, create_geojson, geometry_columns,
+                                   parse_geometry)
+from cji_pipeline.geometry_cache import GeometryCache
+
+# Parse errors are expected to be rare; keep them from flooding the benchmark output
+quiet_log = logging.getLogger("benchmarks.pipeline")
+quiet_log.setLevel(logging.CRITICAL)
+
+def _time(func, repeat):
+    """Run func repeat times and return (last result, list of wall times)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return result, timings
+
+def _summary(name, rows, timings, **extra):
+    median = float(np.median(timings))
+    return {
+        "name": name,
+        "rows": rows,
+        "median_s": round(median, 4),
+        "min_s": round(float(np.min(timings)), 4),
+        "rows_per_s": round(rows / median, 1) if median else None,
+        **extra,
+    }
+
+def create_geojson_per_row(df):
+    """Convert every row to GeoJSON one at a time, without the derived geometry columns."""
+    return df.apply(create_geojson, axis=1, log=quiet_log)
+
+def add_geometry(df):
+    """Apply the pipeline's geometry conversion and source system mapping to bindings."""
+    geometries = df.apply(parse_geometry, axis=1, log=quiet_log)
+    df = df.join(geometry_columns(geometries))
+    df["source_system"] = df["namespace"].map(SOURCE_SYSTEM_MAPPING)
+    return df
+
+def cached_geometry(cache, df):
+    """Derive the geometry columns through a geometry cache, as the pipeline does."""
+    cache.load(log=quiet_log)
+    columns = cache.geometry_columns(df, log=quiet_log)
+    cache.save()
+    return columns
+
+def build_all_infras(df):
+    """Run the all_infras SQL over processed raw data and return the result as Arrow."""
+    with duckdb.connect(database=":memory:") as conn:
+        conn.register("temp_raw_data", df)
+        conn.create_function("split_camel_case", split_camel_case, ["VARCHAR"], "VARCHAR")
+        conn.execute(ALL_INFRAS_SQL)
+        return conn.execute("SELECT * FROM all_infras").fetch_arrow_table()
+
+def parquet_roundtrip(table):
+    """Encode an Arrow table to Parquet in memory and decode it again."""
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    size = buffer.tell()
+    buffer.seek(0)
+    pq.read_table(buffer)
+    return size
+
+def run(bindings, repeat=3):
+    """
+    Run all pipeline benchmarks over a DataFrame of synthetic bindings.
+    """
+    rows = len(bindings)
+    results = []
+
+    # create_geojson only builds the geojson column. geometry_columns builds all the
+    # derived columns, three GeoJSON strings per row among them, so it is not the faster
+    # of the two at any size; parse_geometry shows how much of it is the per-row parsing.
+    _, timings = _time(lambda: create_geojson_per_row(bindings), repeat)
+    results.append(_summary("create_geojson", rows, timings, columns=1))
+
+    _, timings = _time(lambda: bindings.apply(parse_geometry, axis=1, log=quiet_log), repeat)
+    results.append(_summary("parse_geometry", rows, timings))
+
+    raw_df, timings = _time(lambda: add_geometry(bindings), repeat)
+    results.append(_summary("geometry_columns", rows, timings,
+                            columns=len(DERIVED_GEOMETRY_COLUMNS)))
+
+    # Rerun with every geometry already in a local cache file, as in a daily run
+    # where the coordinates did not change; loading and saving the file is included
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = GeometryCache(local_path=os.path.join(tmp_dir, "geometry_cache.parquet"))
+        cached_geometry(cache, bindings)
+        _, timings = _time(lambda: cached_geometry(cache, bindings), repeat)
+        results.append(_summary("geometry_columns_cached", rows, timings,
+                                hits=cache.stats["hits"], misses=cache.stats["misses"]))
+
+    all_infras_table, timings = _time(lambda: build_all_infras(raw_df), repeat)
+    results.append(_summary("all_infras_sql", rows, timings))
+
+    raw_table = pa.Table.from_pandas(raw_df)
+    size, timings = _time(lambda: parquet_roundtrip(raw_table), repeat)
+    results.append(_summary("parquet_roundtrip_raw", rows, timings, parquet_bytes=size,
+                            mb_per_s=round(size / float(np.median(timings)) / 1e6, 1)))
+
+    size, timings = _time(lambda: parquet_roundtrip(all_infras_table), repeat)
+    results.append(_summary("parquet_roundtrip_all_infras", rows, timings, parquet_bytes=size,
+                            mb_per_s=round(size / float(np.median(timings)) / 1e6, 1)))
+
+    return results, all_infras_table
@@ -0,0 +1,106 @@
+"""
+Helpers to summarize, persist and compare benchmark results across runs.
+"""
+import os
+import json
+import glob
+import platform
+import subprocess
+from datetime import datetime, timezone
+import numpy as np
+from ._paths import REPO_ROOT
+
+DEFAULT_RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+def summarize_latencies(latencies_s):
+    """
+    Summarize a list of latencies (in seconds) as p50/p90/p99/mean/max in milliseconds.
+    """
+    latencies_ms = np.asarray(latencies_s, dtype=float) * 1000
+    if latencies_ms.size == 0:
+        return {"count": 0}
+    return {
+        "count": int(latencies_ms.size),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(latencies_ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+        "mean_ms": round(float(latencies_ms.mean()), 3),
+        "max_ms": round(float(latencies_ms.max()), 3),
+    }
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def save_results(suite, results, results_dir=DEFAULT_RESULTS_DIR):
+    """
+    Write the results of a suite to a timestamped JSON file and return its path.
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    created_at = datetime.now(timezone.utc)
+    document = {
+        "suite": suite,
+        "created_at": created_at.isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    path = os.path.join(results_dir, f"{suite}-{created_at.strftime('%Y%m%dT%H%M%SZ')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    return path
+
+def load_previous(suite, results_dir=DEFAULT_RESULTS_DIR, exclude=None):
+    """
+    Return the most recent stored results for a suite, or None.
+    """
+    paths = sorted(glob.glob(os.path.join(results_dir, f"{suite}-*.json")))
+    paths = [path for path in paths if path != exclude]
+    if not paths:
+        return None
+    with open(paths[-1], encoding="utf-8") as f:
+        return json.load(f)
+
+def _result_key(result):
+    return (result["name"], result.get("rows"), result.get("concurrency"))
+
+# Throughput metrics, where a higher value is better; lower is better for everything else
+HIGHER_IS_BETTER = ("_per_s",)
+
+def compare(current, previous):
+    """
+    Format a comparison of two result documents as a plain-text table.
+    """
+    if previous is None:
+        return "No previous results to compare with."
+
+    previous_by_key = {_result_key(result): result for result in previous["results"]}
+    lines = [f"Compared with {previous['created_at']} ({previous.get('git_commit')})",
+             f"{'benchmark':<40} {'metric':<16} {'previous':>12} {'current':>12} {'change':>8}"]
+    for result in current:
+        old = previous_by_key.get(_result_key(result))
+        if old is None:
+            continue
+        label = result["name"] + (f"[{result['rows']}]" if result.get("rows") else "")
+        for metric, value in result.items():
+            old_value = old.get(metric)
+            if (metric in ("rows", "concurrency", "count") or not isinstance(value, (int, float))
+                    or not isinstance(old_value, (int, float)) or not old_value):
+                continue
+            change = (value - old_value) / old_value * 100
+            better = change > 0 if metric.endswith(HIGHER_IS_BETTER) else change < 0
+            marker = " " if abs(change) < 5 else "+" if better else "-"
+            lines.append(f"{label:<40} {metric:<16} {old_value:>12.3f} {value:>12.3f} "
+                         f"{change:>+7.1f}%{marker}")
+    return "\n".join(lines)
+
+def print_results(results):
+    """Print results as one line per benchmark."""
+    for result in results:
+        details = ", ".join(f"{key}={value}" for key, value in result.items() if key != "name")
+        print(f"{result['name']}: {details}")
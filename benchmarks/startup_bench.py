@@ -0,0 +1,107 @@
+"""
+Startup benchmark: how long after launch the API answers its first requests.
+
+Every start is a fresh uvicorn process against a local moto S3 server, so module
+imports, the snapshot load and the local snapshot file are all part of the timing.
+"""
+import os
+import sys
+import time
+import tempfile
+import subprocess
+import statistics
+import httpx
+from ._paths import API_DIR
+from .api_bench import API_KEY, free_port, local_s3
+
+# Startup milestones, in the order they are expected to be reached
+MILESTONES = {
+    "health_s": "/health answers 200",
+    "ready_s": "/ready answers 200, a snapshot can be served",
+    "first_200_s": "/api/infras?limit=1 answers 200",
+    "loaded_s": "the current version has been loaded from S3",
+}
+
+def import_time():
+    """Time to import the application in a fresh interpreter, in seconds."""
+    code = ("import time; start = time.perf_counter(); import src.main; "
+            "print(time.perf_counter() - start)")
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=API_DIR, text=True)
+    return float(output.strip().splitlines()[-1])
+
+def _poll(client, path):
+    try:
+        return client.get(path)
+    except httpx.TransportError:
+        return None
+
+def time_startup(local_snapshot_path, timeout=120):
+    """
+    Start the API in a subprocess and return the seconds until each milestone.
+    """
+    port = free_port()
+    env = {**os.environ, "API_LOCAL_SNAPSHOT_PATH": local_snapshot_path}
+    start = time.perf_counter()
+    process = subprocess.Popen(  # pylint: disable=R1732
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=API_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    marks = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", headers={"api-key": API_KEY},
+                          timeout=timeout) as client:
+            while len(marks) < len(MILESTONES):
+                if process.poll() is not None:
+                    raise RuntimeError("The API exited during startup")
+                if time.perf_counter() - start > timeout:
+                    raise TimeoutError(f"The API did not start within {timeout}s")
+
+                response = _poll(client, "/health")
+                if response is None:
+                    time.sleep(0.005)
+                    continue
+                if response.status_code == 200:
+                    marks.setdefault("health_s", time.perf_counter() - start)
+
+                response = _poll(client, "/ready")
+                if response is not None and response.status_code == 200:
+                    marks.setdefault("ready_s", time.perf_counter() - start)
+                    if not response.json()["loading"]:
+                        marks.setdefault("loaded_s", time.perf_counter() - start)
+
+                if "ready_s" in marks:
+                    response = _poll(client, "/api/infras?limit=1")
+                    if response is not None and response.status_code == 200:
+                        marks.setdefault("first_200_s", time.perf_counter() - start)
+                time.sleep(0.005)
+    finally:
+        process.terminate()
+        process.wait()
+    return {milestone: round(marks[milestone], 3) for milestone in MILESTONES}
+
+def _median(samples):
+    return {milestone: round(statistics.median(sample[milestone] for sample in samples), 3)
+            for milestone in MILESTONES}
+
+def run(all_infras_table, repeat=3):
+    """
+    Measure the startup of the API serving all_infras_table: without a local snapshot
+    (a cold start) and with the local snapshot written by the previous start.
+    """
+    results = [{"name": "import_src_main",
+                "import_s": round(statistics.median(import_time() for _ in range(repeat)), 3)}]
+
+    with local_s3(all_infras_table), tempfile.TemporaryDirectory() as tmp_dir:
+        local_snapshot_path = os.path.join(tmp_dir, "snapshot.arrow")
+        cold, warm = [], []
+        for _ in range(repeat):
+            if os.path.exists(local_snapshot_path):
+                os.remove(local_snapshot_path)
+            cold.append(time_startup(local_snapshot_path))
+            warm.append(time_startup(local_snapshot_path))
+
+    results.append({"name": "startup_cold", "rows": all_infras_table.num_rows, **_median(cold)})
+    results.append({"name": "startup_local_snapshot", "rows": all_infras_table.num_rows,
+                    **_median(warm)})
+    return results
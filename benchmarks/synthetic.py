@@ -0,0 +1,177 @@
+"""
+Generator of realistic synthetic SPARQL bindings for the CJI pipeline and API.
+
+The generated rows have the same columns as LinkedDataAPI.fetch_data() returns,
+with a mix of points and polygons in Lambert72 (EPSG:31370) and WGS84 (CRS84),
+spread over the namespaces the pipeline knows about.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+LAMBERT72_SRS = "http://www.opengis.net/def/crs/EPSG/0/31370"
+WGS84_SRS = "http://www.opengis.net/def/crs/OGC/1.3/CRS84"
+
+# Namespace profiles: (namespace, weight, geometry kind, CRS). Mirrors the
+# namespaces in cji_pipeline.assets.SOURCE_SYSTEM_MAPPING, with Kampas and Terra
+# being the polygon-heavy sources.
+NAMESPACE_PROFILES = [
+    ("https://kampas.be/id/gebouw/", 0.20, "polygon", "lambert72"),
+    ("https://erfgoedkaart.be/id/infrastructuur/", 0.15, "point", "lambert72"),
+    ("https://data.publiq.be/id/place/udb/", 0.30, "point", "wgs84"),
+    ("https://terra.be/id/infrastructuur/", 0.10, "polygon", "lambert72"),
+    ("https://www.jeugdmaps.be/id/buitenruimte/", 0.08, "polygon", "wgs84"),
+    ("https://natuurenbos.vlaanderen.be/id/buitenruimte/", 0.07, "polygon", "wgs84"),
+    ("https://www.jeugdmaps.be/id/gebouw/", 0.10, "point", "lambert72"),
+]
+
+LOCATION_TYPES = [
+    "http://infrastructuur.dcjm.be/id/type#jeugdverblijfOfJeugdhostel",
+    "http://infrastructuur.dcjm.be/id/type#jeugdlokaal",
+    "http://infrastructuur.dcjm.be/id/type#cultuurcentrum",
+    "http://infrastructuur.dcjm.be/id/type#bibliotheek",
+    "http://infrastructuur.dcjm.be/id/type#speelterrein",
+    "http://infrastructuur.dcjm.be/id/type#museum",
+    "http://infrastructuur.dcjm.be/id/type#repetitieruimte",
+    "http://infrastructuur.dcjm.be/id/type#erfgoedsite",
+]
+
+INFRA_TYPES = [
+    "https://data.vlaanderen.be/ns/gebouw#Gebouw",
+    "https://data.vlaanderen.be/ns/cultuur-en-jeugd/infrastructuur#Buitenruimte",
+    "https://data.vlaanderen.be/ns/cultuur-en-jeugd/infrastructuur#Infrastructuur",
+]
+
+CITIES = [
+    ("1000", "Brussel"), ("2000", "Antwerpen"), ("3000", "Leuven"), ("3500", "Hasselt"),
+    ("3910", "Sint-Huibrechts-Lille"), ("8000", "Brugge"), ("8500", "Kortrijk"),
+    ("9000", "Gent"), ("9300", "Aalst"), ("2800", "Mechelen"), ("2300", "Turnhout"),
+    ("8400", "Oostende"), ("3290", "Diest"), ("9100", "Sint-Niklaas"), ("2440", "Geel"),
+]
+
+STREETS = ["Kerkstraat", "Stationsstraat", "Dorpsstraat", "Molenstraat", "Schoolstraat",
+           "Bosuilstraat", "Nieuwstraat", "Kapelstraat", "Veldstraat", "Grote Markt"]
+
+SOURCES = ["https://data.uitwisselingsplatform.be/id/dataprovider/kampas",
+           "https://data.uitwisselingsplatform.be/id/dataprovider/publiq",
+           "https://data.uitwisselingsplatform.be/id/dataprovider/erfgoed"]
+
+COLUMNS = ["subject", "locationName", "locationType", "thoroughfare", "huisnummer",
+           "fullAddress", "postCode", "city", "gml", "point", "bron", "infraType",
+           "createdBy", "identifier", "localid", "namespace", "adresregisteruri",
+           "perceeluri"]
+
+# Rough extent of Flanders in both coordinate systems
+LAMBERT72_EXTENT = (22000.0, 153000.0, 258000.0, 244000.0)
+WGS84_EXTENT = (2.55, 50.69, 5.91, 51.50)
+
+def _format_point(x, y, crs):
+    if crs == "lambert72":
+        return (f'<gml:Point srsName="{LAMBERT72_SRS}">'
+                f'<gml:pos>{x:.2f} {y:.2f}</gml:pos></gml:Point>')
+    return (f'<gml:Point srsName="{WGS84_SRS}">'
+            f'<gml:coordinates>{x:.7f},{y:.7f}</gml:coordinates></gml:Point>')
+
+def _format_polygon(xs, ys, crs):
+    srs_name = LAMBERT72_SRS if crs == "lambert72" else WGS84_SRS
+    precision = 2 if crs == "lambert72" else 7
+    pos_list = " ".join(f"{x:.{precision}f} {y:.{precision}f}" for x, y in zip(xs, ys))
+    return (f'<gml:Polygon srsName="{srs_name}"><gml:exterior><gml:LinearRing>'
+            f'<gml:posList>{pos_list}</gml:posList></gml:LinearRing></gml:exterior></gml:Polygon>')
+
+def _polygon_ring(rng, center_x, center_y, radius, num_vertices):
+    """Random star-shaped closed ring around a center."""
+    angles = np.sort(rng.uniform(0, 2 * np.pi, num_vertices))
+    radii = radius * rng.uniform(0.6, 1.0, num_vertices)
+    xs = center_x + radii * np.cos(angles)
+    ys = center_y + radii * np.sin(angles)
+    return np.append(xs, xs[0]), np.append(ys, ys[0])
+
+def generate_bindings(num_rows, seed=42, max_vertices=200):
+    """
+    Generate a DataFrame of synthetic SPARQL bindings with num_rows rows.
+    The output is deterministic for a given seed.
+    """
+    rng = np.random.default_rng(seed)
+
+    weights = np.array([profile[1] for profile in NAMESPACE_PROFILES])
+    profile_idx = rng.choice(len(NAMESPACE_PROFILES), size=num_rows, p=weights / weights.sum())
+    city_idx = rng.integers(0, len(CITIES), num_rows)
+    has_address = rng.random(num_rows) < 0.8
+
+    # Polygon vertex counts follow a long tail, as real building outlines do
+    vertex_counts = np.clip(rng.lognormal(mean=2.5, sigma=0.8, size=num_rows).astype(int),
+                            4, max_vertices)
+
+    lambert_x = rng.uniform(LAMBERT72_EXTENT[0], LAMBERT72_EXTENT[2], num_rows)
+    lambert_y = rng.uniform(LAMBERT72_EXTENT[1], LAMBERT72_EXTENT[3], num_rows)
+    wgs84_x = rng.uniform(WGS84_EXTENT[0], WGS84_EXTENT[2], num_rows)
+    wgs84_y = rng.uniform(WGS84_EXTENT[1], WGS84_EXTENT[3], num_rows)
+    sizes = rng.uniform(10, 150, num_rows)
+
+    records = {column: [None] * num_rows for column in COLUMNS}
+    for i in range(num_rows):
+        namespace, _, kind, crs = NAMESPACE_PROFILES[profile_idx[i]]
+        postal_code, city = CITIES[city_idx[i]]
+        localid = f"{i:08d}"
+
+        if crs == "lambert72":
+            x, y, radius = lambert_x[i], lambert_y[i], sizes[i]
+        else:
+            # ~1e-5 degrees per meter at Flemish latitudes
+            x, y, radius = wgs84_x[i], wgs84_y[i], sizes[i] * 1e-5
+
+        if kind == "point":
+            records["point"][i] = _format_point(x, y, crs)
+        else:
+            xs, ys = _polygon_ring(rng, x, y, radius, vertex_counts[i])
+            records["gml"][i] = _format_polygon(xs, ys, crs)
+
+        records["subject"][i] = f"{namespace}{localid}"
+        records["locationName"][i] = f"Infrastructuur {i}"
+        records["locationType"][i] = LOCATION_TYPES[i % len(LOCATION_TYPES)]
+        records["infraType"][i] = INFRA_TYPES[i % len(INFRA_TYPES)]
+        records["bron"][i] = SOURCES[profile_idx[i] % len(SOURCES)]
+        records["identifier"][i] = f"{namespace}{localid}"
+        records["localid"][i] = localid
+        records["namespace"][i] = namespace
+
+        if has_address[i]:
+            street = STREETS[i % len(STREETS)]
+            house_number = str(1 + i % 250)
+            records["thoroughfare"][i] = street
+            records["huisnummer"][i] = house_number
+            records["postCode"][i] = postal_code
+            records["city"][i] = city
+            records["fullAddress"][i] = f"{street} {house_number}, {postal_code} {city}"
+            records["adresregisteruri"][i] = (
+                f"https://data.vlaanderen.be/id/adres/{1000000 + i}")
+
+    return pd.DataFrame(records, columns=COLUMNS)
+
+def to_sparql_json(df):
+    """
+    Convert generated bindings to the SPARQL JSON results format returned by the
+    Linked Data API, e.g. to exercise LinkedDataAPI.fetch_data().
+    """
+    bindings = []
+    for record in df.to_dict(orient="records"):
+        bindings.append({key: {"type": "literal", "value": value}
+                         for key, value in record.items() if value is not None})
+    return {"head": {"vars": list(df.columns)}, "results": {"bindings": bindings}}
+
+def load_or_generate(num_rows, seed=42, data_dir=None):
+    """
+    Return synthetic bindings, reusing a cached Parquet file in data_dir if present.
+    """
+    if data_dir is None:
+        return generate_bindings(num_rows, seed=seed)
+
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"bindings-{num_rows}-{seed}.parquet")
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+
+    df = generate_bindings(num_rows, seed=seed)
+    df.to_parquet(path, index=False)
+    return df
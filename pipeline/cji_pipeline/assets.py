@@ -1,31 +1,143 @@
 import io
+import os
 import re
-import json
+from datetime import datetime, timezone
 from titlecase import titlecase
-from dagster import MetadataValue, OpExecutionContext, asset, AssetIn
+from dagster import (MetadataValue, OpExecutionContext, StaticPartitionsDefinition, asset,
+                     AssetIn)
+import numpy as np
 import pyarrow as pa
 import pyarrow.parquet as pq
-from pyproj import Transformer
-import pandas as pd
+from . import snapshots
+from .profiling import AssetProfiler, buffer_size
+
+# Map 'namespace' to 'source_system'
+SOURCE_SYSTEM_MAPPING = {
+    'https://kampas.be/id/gebouw/': 'Kampas',
+    'https://erfgoedkaart.be/id/infrastructuur/': 'Erfgoedkaart',
+    'https://data.publiq.be/id/place/udb/': 'UiTdatabank',
+    'https://terra.be/id/infrastructuur/': 'Terra',
+    'https://www.jeugdmaps.be/id/buitenruimte/': 'Jeugdmaps',
+    'https://natuurenbos.vlaanderen.be/id/buitenruimte/': 'Natuur en bos',
+    'https://www.jeugdmaps.be/id/gebouw/': 'Jeugdmaps',
+    # Add other mappings as needed
+}
+
+# The data is partitioned by source system. Namespaces that are not in the mapping
+# above end up in the 'Other' partition.
+OTHER_SOURCE_SYSTEM = "Other"
+SOURCE_SYSTEMS = sorted(set(SOURCE_SYSTEM_MAPPING.values())) + [OTHER_SOURCE_SYSTEM]
+source_system_partitions = StaticPartitionsDefinition(SOURCE_SYSTEMS)
+
+def source_system_namespaces(source_system):
+    """
+    Return the namespaces of a source system partition, and whether these are the
+    namespaces to exclude rather than to include.
+    """
+    if source_system == OTHER_SOURCE_SYSTEM:
+        return list(SOURCE_SYSTEM_MAPPING), True
+    return [namespace for namespace, system in SOURCE_SYSTEM_MAPPING.items()
+            if system == source_system], False
+
+def source_system_slug(source_system):
+    """Turn a source system name such as 'Natuur en bos' into 'natuur-en-bos'."""
+    return re.sub(r'[^a-z0-9]+', '-', source_system.lower()).strip('-')
+
+ALL_INFRAS_SQL = """
+    CREATE OR REPLACE TABLE all_infras AS
+    SELECT row_number() OVER () AS id,
+           locationName AS location_name,
+           locationType AS location_type_uri,
+           split_camel_case(locationType) AS location_type_label,
+           infraType AS infra_type_uri,
+           thoroughfare AS street,
+           huisnummer AS house_number,
+           postCode AS postal_code,
+           city,
+           bron AS uwp_source_dp,
+           createdBy AS created_by,
+           subject AS source_uri,
+           adresregisteruri AS adresregister_uri,
+           perceeluri AS perceel_uri,
+           source_system,
+           identifier,
+           localid,
+           namespace,
+           point,
+           gml,
+           geojson,
+           centroid_lon,
+           centroid_lat,
+           bbox_min_lon,
+           bbox_min_lat,
+           bbox_max_lon,
+           bbox_max_lat,
+           geojson_simplified,
+           geojson_coarse
+    FROM temp_raw_data;
+"""
+
+# Dimensions of the summary table and the columns whose missing values it counts
+SUMMARY_DIMENSIONS = ["source_system", "location_type_label", "city", "postal_code"]
+SUMMARY_QUALITY_COLUMNS = ["location_name", "street", "house_number", "postal_code", "city",
+                           "adresregister_uri", "perceel_uri"]
+
+INFRAS_SUMMARY_SQL = f"""
+    SELECT {", ".join(SUMMARY_DIMENSIONS)},
+           count(*) AS num_records,
+           count(geojson) AS num_with_geometry,
+           count(point) AS num_with_point,
+           count(gml) AS num_with_polygon,
+           {", ".join(f"count(*) - count({column}) AS null_{column}"
+                      for column in SUMMARY_QUALITY_COLUMNS)}
+    FROM all_infras
+    GROUP BY {", ".join(SUMMARY_DIMENSIONS)}
+    ORDER BY {", ".join(SUMMARY_DIMENSIONS)};
+"""
+
+def split_camel_case(value):
+    """
+    Turn a type URI such as '...#jeugdverblijfOfJeugdhostel' into a readable label.
+    Registered as a DuckDB function in the all_infras transform.
+    """
+    if value and "#" in value:
+        value = value.split("#")[-1]
+        value = re.sub(r'(?<!^)([A-Z])', r' \1', value)
+        value = titlecase(value.lower())
+    return value
 
-@asset(group_name="CJI", required_resource_keys={"linked_data_api"})
+@asset(
+    group_name="CJI",
+    required_resource_keys={"linked_data_api"},
+    partitions_def=source_system_partitions,
+)
 def raw_infras_data(context: OpExecutionContext):
     """
-    Fetches raw infrastructure data from UiTwisselingsplatform.
+    Fetches the raw infrastructure data of one source system from UiTwisselingsplatform.
     """
     linked_data_api = context.resources.linked_data_api
-    df = linked_data_api.fetch_data()
-
-    # Convert DataFrame to Parquet bytes
-    table = pa.Table.from_pandas(df)
-    parquet_buffer = io.BytesIO()
-    pq.write_table(table, parquet_buffer)
-    parquet_buffer.seek(0)
+    namespaces, exclude = source_system_namespaces(context.partition_key)
+    profiler = AssetProfiler(context)
+
+    with profiler.capture():
+        with profiler.phase("sparql_fetch") as phase:
+            df = linked_data_api.fetch_data(namespaces=namespaces, exclude=exclude)
+            phase.rows = len(df)
+            phase.bytes_in = linked_data_api.last_response_bytes
+
+        # Convert DataFrame to Parquet bytes
+        with profiler.phase("parquet_encode", rows=len(df)) as phase:
+            table = pa.Table.from_pandas(df)
+            parquet_buffer = io.BytesIO()
+            pq.write_table(table, parquet_buffer)
+            parquet_buffer.seek(0)
+            phase.bytes_out = buffer_size(parquet_buffer)
 
     context.add_output_metadata(
         {
             "num_records": len(df),
             "preview": MetadataValue.md(df.head().to_markdown()),
+            **profiler.to_metadata(),
         }
     )
 
@@ -34,8 +146,9 @@ def raw_infras_data(context: OpExecutionContext):
 
 @asset(
     group_name="CJI",
-    required_resource_keys={"s3"},
+    required_resource_keys={"s3", "geometry_cache"},
     ins={"raw_infras_data": AssetIn()},
+    partitions_def=source_system_partitions,
 )
 def raw_infras_data_s3(context: OpExecutionContext, raw_infras_data):  # pylint: disable=W0621
     """
@@ -43,146 +156,68 @@ def raw_infras_data_s3(context: OpExecutionContext, raw_infras_data):  # pylint:
     and uploads it to S3.
     """
     s3_client = context.resources.s3
+    slug = source_system_slug(context.partition_key)
+    geometry_cache = context.resources.geometry_cache.partition(slug)
     bucket_name = s3_client.bucket_name
-    s3_key = "raw_infras_data.parquet"
-
-    # Read Parquet data from the buffer into a DataFrame
-    df = pq.read_table(raw_infras_data).to_pandas()
-
-    # Define transformers
-    lambert72_to_wgs84 = Transformer.from_crs("EPSG:31370", "EPSG:4326", always_xy=True)
-
-    def create_geojson(row):
-        point_field = row.get('point')
-        gml_field = row.get('gml')
-
-        # Helper function to parse srsName
-        def get_srs_name(gml_string):
-            match = re.search(r'srsName=["\']([^"\']+)["\']', gml_string)
-            if match:
-                return match.group(1)
-            return None
-
-        # Determine CRS based on srsName
-        def get_transformer(srs_name):
-            if srs_name:
-                if '31370' in srs_name:
-                    return lambert72_to_wgs84
-                elif 'crs84' in srs_name.lower() or '4326' in srs_name:
-                    return None  # Already in WGS84
-            return None  # Default to WGS84 if unknown
-
-        # Process point data
-        if pd.notnull(point_field):
-            srs_name = get_srs_name(point_field)
-            transformer = get_transformer(srs_name)
-
-            # Handle different point formats
-            coord_match = re.search(r'<gml:coordinates>([^<]+)</gml:coordinates>', point_field)
-            if not coord_match:
-                coord_match = re.search(r'<gml:pos>([^<]+)</gml:pos>', point_field)
-            if coord_match:
-                coords_str = coord_match.group(1).strip()
-                # Split on commas or whitespace
-                coords = re.split(r'[,\s]+', coords_str)
-                # Clean up coordinate strings
-                coords = [coord.strip() for coord in coords if coord.strip()]
-                if len(coords) >= 2:
-                    try:
-                        x_coord, y_coord = map(float, coords[:2])
-
-                        if transformer:
-                            lon, lat = transformer.transform(x_coord, y_coord)
-                        else:
-                            lon, lat = x_coord, y_coord
-
-                        # Create GeoJSON Point feature
-                        geojson_geometry = {
-                            "type": "Point",
-                            "coordinates": [lon, lat]
-                        }
-                        return json.dumps(geojson_geometry)
-                    except ValueError as e:
-                        context.log.error(f"Error converting coordinates to float for row {row.name}: {e}")
-                        return None
+    s3_key = f"raw_infras_data/{slug}.parquet"
+    profiler = AssetProfiler(context)
+
+    with profiler.capture():
+        # Read Parquet data from the buffer into a DataFrame
+        with profiler.phase("parquet_decode", bytes_in=buffer_size(raw_infras_data)) as phase:
+            df = pq.read_table(raw_infras_data).to_pandas()
+            phase.rows = len(df)
+
+        with profiler.phase("geometry_cache_load") as phase:
+            phase.rows = geometry_cache.load(log=context.log)
+
+        # Derive the 'geojson', centroid, bbox and simplified geometry fields. Geometries
+        # seen in earlier runs come from the cache, the others are parsed and reprojected
+        with profiler.phase("geometry_conversion", rows=len(df)):
+            df = df.join(geometry_cache.geometry_columns(df, log=context.log))
+        context.log.info(f"Geometry cache: {geometry_cache.stats['hits']} hits, "
+                         f"{geometry_cache.stats['misses']} misses")
+
+        with profiler.phase("geometry_cache_save"):
+            geometry_cache.save()
+
+        # Map 'namespace' to 'source_system'
+        df['source_system'] = df['namespace'].map(SOURCE_SYSTEM_MAPPING)
+
+        # Convert DataFrame to Parquet in a spooled temporary file
+        with profiler.phase("parquet_encode", rows=len(df)) as phase:
+            table = pa.Table.from_pandas(df)
+            parquet_file = s3_client.spooled_file()
+            pq.write_table(table, parquet_file)
+            parquet_file.seek(0)
+            phase.bytes_out = buffer_size(parquet_file)
+
+        # Upload the file to S3, unless the object already holds the same content
+        with profiler.phase("s3_upload", rows=len(df), bytes_out=buffer_size(parquet_file)):
+            try:
+                with parquet_file:
+                    uploaded = s3_client.upload(parquet_file, s3_key)
+                if uploaded:
+                    context.log.info(f"Uploaded to s3://{bucket_name}/{s3_key}")
                 else:
-                    context.log.error(f"Insufficient coordinates in point for row {row.name}")
-                    return None
-
-        # Process polygon data
-        elif pd.notnull(gml_field):
-            srs_name = get_srs_name(gml_field)
-            transformer = get_transformer(srs_name)
-
-            pos_list_match = re.search(r'<gml:posList>([^<]+)</gml:posList>', gml_field)
-            if pos_list_match:
-                coord_list_str = pos_list_match.group(1).strip()
-                coord_list = re.split(r'\s+', coord_list_str)
-                coords = list(map(float, coord_list))
-                if len(coords) % 2 != 0:
-                    context.log.error(f"Invalid number of coordinates in posList for row {row.name}")
-                    return None
-
-                points = [(coords[i], coords[i + 1]) for i in range(0, len(coords), 2)]
-
-                if transformer:
-                    transformed_points = [transformer.transform(x, y) for x, y in points]
-                else:
-                    transformed_points = points
-
-                # Create GeoJSON Polygon feature
-                geojson_geometry = {
-                    "type": "Polygon",
-                    "coordinates": [transformed_points]
-                }
-                return json.dumps(geojson_geometry)
-            else:
-                context.log.error(f"No posList found in gml for row {row.name}")
-                return None
-        else:
-            return None
-
-    # Apply the function to create the 'geojson' field
-    df['geojson'] = df.apply(create_geojson, axis=1)
-
-    # Map 'namespace' to 'source_system'
-    source_system_mapping = {
-        'https://kampas.be/id/gebouw/': 'Kampas',
-        'https://erfgoedkaart.be/id/infrastructuur/': 'Erfgoedkaart',
-        'https://data.publiq.be/id/place/udb/': 'UiTdatabank',
-        'https://terra.be/id/infrastructuur/': 'Terra',
-        'https://www.jeugdmaps.be/id/buitenruimte/': 'Jeugdmaps',
-        'https://natuurenbos.vlaanderen.be/id/buitenruimte/': 'Natuur en bos',
-        'https://www.jeugdmaps.be/id/gebouw/': 'Jeugdmaps',
-        # Add other mappings as needed
-    }
-    df['source_system'] = df['namespace'].map(source_system_mapping)
-
-    # Convert DataFrame to Parquet bytes
-    table = pa.Table.from_pandas(df)
-    parquet_buffer = io.BytesIO()
-    pq.write_table(table, parquet_buffer)
-    parquet_buffer.seek(0)
+                    context.log.info(f"s3://{bucket_name}/{s3_key} is unchanged, skipped upload")
+            except Exception as e:
+                context.log.error(f"Failed to upload to S3: {e}")
+                raise
 
     context.add_output_metadata(
         {
             "num_records": len(df),
             "preview": MetadataValue.md(df.head().to_markdown()),
+            "uploaded": uploaded,
+            "geometry_cache_hits": geometry_cache.stats["hits"],
+            "geometry_cache_misses": geometry_cache.stats["misses"],
+            "geometry_cache_evicted": geometry_cache.stats["evicted"],
+            "geometry_cache_entries": geometry_cache.stats["entries"],
+            **profiler.to_metadata(),
         }
     )
 
-    # Upload the buffer to S3
-    try:
-        s3_client.upload_fileobj(
-            Fileobj=parquet_buffer,
-            Bucket=bucket_name,
-            Key=s3_key,
-        )
-        context.log.info(f"Uploaded to s3://{bucket_name}/{s3_key}")
-    except Exception as e:
-        context.log.error(f"Failed to upload to S3: {e}")
-        raise
-
     # Return the S3 key for downstream assets
     return s3_key
 
@@ -190,10 +225,12 @@ def raw_infras_data_s3(context: OpExecutionContext, raw_infras_data):  # pylint:
     group_name="CJI",
     required_resource_keys={"s3", "duckdb"},
     ins={"raw_infras_data_s3": AssetIn()},
+    partitions_def=source_system_partitions,
 )
 def all_infras(context: OpExecutionContext, raw_infras_data_s3):  # pylint: disable=W0621
     """
     Processes the infrastructure data using DuckDB, reading from S3.
+    The ids are only unique within the partition until all_infras_final combines them.
     """
     # Read Parquet data from S3 into DuckDB
     duckdb = context.resources.duckdb
@@ -201,89 +238,263 @@ def all_infras(context: OpExecutionContext, raw_infras_data_s3):  # pylint: disa
     bucket_name = s3_client.bucket_name
     s3_key = raw_infras_data_s3
 
-    # Download the Parquet file from S3
-    parquet_buffer = io.BytesIO()
-    s3_client.download_fileobj(Bucket=bucket_name, Key=s3_key, Fileobj=parquet_buffer)
-    parquet_buffer.seek(0)
-
-    # Read Parquet data into a DataFrame
-    df = pq.read_table(parquet_buffer).to_pandas()
-
-    # Create an in-memory DuckDB connection
-    with duckdb.get_connection() as conn:
-        # Register the DataFrame as a DuckDB table
-        conn.register("temp_raw_data", df)
-
-        # Define the split_camel_case function in DuckDB
-        def split_camel_case(value):
-            if value and "#" in value:
-                value = value.split("#")[-1]
-                value = re.sub(r'(?<!^)([A-Z])', r' \1', value)
-                value = titlecase(value.lower())
-            return value
-
-        conn.create_function('split_camel_case', split_camel_case, ['VARCHAR'], 'VARCHAR')
-
-        # Perform SQL operations
-        sql_query = """
-            CREATE OR REPLACE TABLE all_infras AS
-            SELECT row_number() OVER () AS id,
-                   locationName AS location_name,
-                   locationType AS location_type_uri,
-                   split_camel_case(locationType) AS location_type_label,
-                   infraType AS infra_type_uri,
-                   thoroughfare AS street,
-                   huisnummer AS house_number,
-                   postCode AS postal_code,
-                   city,
-                   bron AS uwp_source_dp,
-                   createdBy AS created_by,
-                   subject AS source_uri,
-                   adresregisteruri AS adresregister_uri,
-                   perceeluri AS perceel_uri,
-                   source_system,
-                   identifier,
-                   localid,
-                   namespace,
-                   point,
-                   gml,
-                   geojson
-            FROM temp_raw_data;
-        """
-
-        conn.execute(sql_query)
-
-        # Fetch the processed data into a DataFrame
-        processed_df = conn.execute("SELECT * FROM all_infras").fetchdf()
-
-    # Convert the processed DataFrame to Parquet bytes
-    processed_table = pa.Table.from_pandas(processed_df)
-    processed_parquet_buffer = io.BytesIO()
-    pq.write_table(processed_table, processed_parquet_buffer)
-    processed_parquet_buffer.seek(0)
-
-    # Upload the processed Parquet data to S3
-    s3_key_final = "all_infras_final.parquet"
-    try:
-        s3_client.upload_fileobj(
-            Fileobj=processed_parquet_buffer,
-            Bucket=bucket_name,
-            Key=s3_key_final,
-        )
-        context.log.info(f"Processed data uploaded to s3://{bucket_name}/{s3_key_final}")
-    except Exception as e:
-        context.log.error(f"Failed to upload processed data to S3: {e}")
-        raise
+    s3_key_final = f"all_infras/{source_system_slug(context.partition_key)}.parquet"
+    profiler = AssetProfiler(context)
+
+    with profiler.capture():
+        # Download the Parquet file from S3, or reuse the locally cached copy
+        with profiler.phase("s3_download") as phase:
+            parquet_file = s3_client.download(s3_key)
+            phase.bytes_in = buffer_size(parquet_file)
+
+        # Read Parquet data into a DataFrame
+        with parquet_file:
+            with profiler.phase("parquet_decode", bytes_in=buffer_size(parquet_file)) as phase:
+                df = pq.read_table(parquet_file).to_pandas()
+                phase.rows = len(df)
+
+        # Create an in-memory DuckDB connection
+        with profiler.phase("duckdb_transform", rows=len(df)), duckdb.get_connection() as conn:
+            # Register the DataFrame as a DuckDB table
+            conn.register("temp_raw_data", df)
+
+            conn.create_function('split_camel_case', split_camel_case, ['VARCHAR'], 'VARCHAR')
+
+            # Perform SQL operations
+            conn.execute(ALL_INFRAS_SQL)
+
+            # Fetch the processed data into a DataFrame
+            processed_df = conn.execute("SELECT * FROM all_infras").fetchdf()
+
+        # Convert the processed DataFrame to Parquet in a spooled temporary file
+        with profiler.phase("parquet_encode", rows=len(processed_df)) as phase:
+            processed_table = pa.Table.from_pandas(processed_df)
+            processed_parquet_file = s3_client.spooled_file()
+            pq.write_table(processed_table, processed_parquet_file)
+            processed_parquet_file.seek(0)
+            phase.bytes_out = buffer_size(processed_parquet_file)
+
+        # Upload the processed Parquet data to S3
+        with profiler.phase("s3_upload", rows=len(processed_df),
+                            bytes_out=buffer_size(processed_parquet_file)):
+            try:
+                with processed_parquet_file:
+                    uploaded = s3_client.upload(processed_parquet_file, s3_key_final)
+                if uploaded:
+                    context.log.info(
+                        f"Processed data uploaded to s3://{bucket_name}/{s3_key_final}")
+                else:
+                    context.log.info(
+                        f"s3://{bucket_name}/{s3_key_final} is unchanged, skipped upload")
+            except Exception as e:
+                context.log.error(f"Failed to upload processed data to S3: {e}")
+                raise
 
     # Optionally, add output metadata
     context.add_output_metadata(
         {
             "num_records": len(processed_df),
             "s3_path": f"s3://{bucket_name}/{s3_key_final}",
+            "uploaded": uploaded,
             "preview": MetadataValue.md(processed_df.head().to_markdown()),
+            **profiler.to_metadata(),
         }
     )
 
     # Return the S3 key for downstream assets if needed
     return s3_key_final
 
+@asset(
+    group_name="CJI",
+    required_resource_keys={"s3"},
+    ins={"all_infras": AssetIn()},
+)
+def all_infras_final(context: OpExecutionContext, all_infras):  # pylint: disable=W0621
+    """
+    Combines the all_infras partitions into a new version of the dataset and uploads it
+    to S3, together with the delta to the previous version and an updated pointer.
+    """
+    s3_client = context.resources.s3
+    bucket_name = s3_client.bucket_name
+    s3_key_final = "all_infras_final.parquet"
+    retention = int(os.environ.get("CJI_SNAPSHOT_RETENTION", "14"))
+    profiler = AssetProfiler(context)
+
+    # all_infras maps each source system to the S3 key of its partition
+    partition_keys = [(source_system, all_infras[source_system])
+                      for source_system in SOURCE_SYSTEMS if source_system in all_infras]
+
+    with profiler.capture():
+        tables = {}
+        with profiler.phase("s3_download") as phase:
+            phase.bytes_in = 0
+            for source_system, s3_key in partition_keys:
+                with s3_client.download(s3_key) as parquet_file:
+                    phase.bytes_in += buffer_size(parquet_file)
+                    tables[source_system] = pq.read_table(parquet_file)
+
+            pointer = snapshots.read_pointer(s3_client)
+            previous = None
+            if pointer is not None:
+                with s3_client.download(pointer["key"]) as parquet_file:
+                    phase.bytes_in += buffer_size(parquet_file)
+                    previous = pq.read_table(parquet_file)
+
+        # Concatenate the partitions, keep the ids of rows that already existed and
+        # compare the result with the previous version
+        with profiler.phase("combine") as phase:
+            # Empty partitions carry no column types worth merging
+            non_empty = [partition for partition in tables.values() if partition.num_rows]
+            table = pa.concat_tables(non_empty or list(tables.values())[:1],
+                                     promote_options="default")
+            table, delta = snapshots.version_table(table, previous)
+            phase.rows = table.num_rows
+
+        changes = ({"added": 0, "changed": 0, "removed": 0} if delta is None else
+                   {change: int(count) for change, count in
+                    zip(*np.unique(delta.column("change").to_numpy(zero_copy_only=False),
+                                   return_counts=True))})
+        changes = {change: changes.get(change, 0) for change in ("added", "changed", "removed")}
+
+        if delta is not None and not any(changes.values()):
+            context.log.info(f"No changes since version {pointer['version']}, "
+                             "keeping it as the current version")
+            version = pointer["version"]
+            s3_key_version = pointer["key"]
+        else:
+            created_at = datetime.now(timezone.utc).replace(microsecond=0)
+            version = snapshots.new_version(created_at)
+            s3_key_version = snapshots.snapshot_key(version)
+
+            with profiler.phase("parquet_encode", rows=table.num_rows) as phase:
+                parquet_file = s3_client.spooled_file()
+                pq.write_table(table, parquet_file)
+                parquet_file.seek(0)
+                phase.bytes_out = buffer_size(parquet_file)
+                if delta is not None:
+                    delta_file = s3_client.spooled_file()
+                    pq.write_table(delta, delta_file)
+                    delta_file.seek(0)
+                    phase.bytes_out += buffer_size(delta_file)
+
+            with profiler.phase("s3_upload", rows=table.num_rows,
+                                bytes_out=buffer_size(parquet_file)):
+                try:
+                    with parquet_file:
+                        s3_client.upload(parquet_file, s3_key_version)
+                    if delta is not None:
+                        with delta_file:
+                            s3_client.upload(delta_file, snapshots.delta_key(version))
+
+                    # Keep the fixed key up to date for readers that do not use the pointer
+                    s3_client.copy_object(Bucket=bucket_name, Key=s3_key_final,
+                                          CopySource={"Bucket": bucket_name,
+                                                      "Key": s3_key_version})
+                    context.log.info(
+                        f"Version {version} uploaded to s3://{bucket_name}/{s3_key_version}")
+                except Exception as e:
+                    context.log.error(f"Failed to upload combined data to S3: {e}")
+                    raise
+
+            # Point to the new version and drop the versions beyond the retention
+            entry = {
+                "version": version,
+                "key": s3_key_version,
+                "delta_key": snapshots.delta_key(version) if delta is not None else None,
+                "previous_version": pointer["version"] if pointer is not None else None,
+                "created_at": created_at.isoformat(),
+                "num_records": table.num_rows,
+                **changes,
+            }
+            history = [entry, *(pointer["history"] if pointer is not None else [])]
+            retained, expired = history[:retention], history[retention:]
+            snapshots.write_pointer(s3_client, {**entry, "history": retained})
+
+            for expired_entry in expired:
+                keys = [expired_entry["key"], expired_entry.get("delta_key")]
+                s3_client.delete_objects(Bucket=bucket_name, Delete={
+                    "Objects": [{"Key": key} for key in keys if key]})
+            if expired:
+                context.log.info(f"Removed {len(expired)} expired version(s)")
+
+    context.add_output_metadata(
+        {
+            "num_records": table.num_rows,
+            "records_per_source_system": {source_system: partition.num_rows
+                                          for source_system, partition in tables.items()},
+            "version": version,
+            "s3_path": f"s3://{bucket_name}/{s3_key_version}",
+            **changes,
+            "preview": MetadataValue.md(table.slice(0, 5).to_pandas().to_markdown()),
+            **profiler.to_metadata(),
+        }
+    )
+
+    return s3_key_version
+
+@asset(
+    group_name="CJI",
+    required_resource_keys={"s3", "duckdb"},
+    ins={"all_infras_final": AssetIn()},
+)
+def infras_summary(context: OpExecutionContext, all_infras_final):  # pylint: disable=W0621
+    """
+    Summarizes all_infras_final for dashboards: record counts, geometry coverage and
+    missing values per source system, location type, city and postal code.
+    """
+    duckdb = context.resources.duckdb
+    s3_client = context.resources.s3
+    bucket_name = s3_client.bucket_name
+    s3_key_summary = "infras_summary.parquet"
+    profiler = AssetProfiler(context)
+
+    with profiler.capture():
+        with profiler.phase("s3_download") as phase:
+            parquet_file = s3_client.download(all_infras_final)
+            phase.bytes_in = buffer_size(parquet_file)
+
+        # Only read the columns the summary needs
+        with parquet_file:
+            with profiler.phase("parquet_decode", bytes_in=buffer_size(parquet_file)) as phase:
+                columns = list(dict.fromkeys([*SUMMARY_DIMENSIONS, *SUMMARY_QUALITY_COLUMNS,
+                                              "geojson", "point", "gml"]))
+                table = pq.read_table(parquet_file, columns=columns)
+                phase.rows = table.num_rows
+
+        with profiler.phase("duckdb_transform", rows=table.num_rows), \
+                duckdb.get_connection() as conn:
+            conn.register("all_infras", table)
+            summary = conn.execute(INFRAS_SUMMARY_SQL).fetch_arrow_table()
+
+        with profiler.phase("parquet_encode", rows=summary.num_rows) as phase:
+            summary_file = s3_client.spooled_file()
+            pq.write_table(summary, summary_file)
+            summary_file.seek(0)
+            phase.bytes_out = buffer_size(summary_file)
+
+        with profiler.phase("s3_upload", rows=summary.num_rows,
+                            bytes_out=buffer_size(summary_file)):
+            try:
+                with summary_file:
+                    uploaded = s3_client.upload(summary_file, s3_key_summary)
+                if uploaded:
+                    context.log.info(f"Summary uploaded to s3://{bucket_name}/{s3_key_summary}")
+                else:
+                    context.log.info(
+                        f"s3://{bucket_name}/{s3_key_summary} is unchanged, skipped upload")
+            except Exception as e:
+                context.log.error(f"Failed to upload summary to S3: {e}")
+                raise
+
+    context.add_output_metadata(
+        {
+            "num_groups": summary.num_rows,
+            "num_records": table.num_rows,
+            "s3_path": f"s3://{bucket_name}/{s3_key_summary}",
+            "uploaded": uploaded,
+            "preview": MetadataValue.md(summary.slice(0, 5).to_pandas().to_markdown()),
+            **profiler.to_metadata(),
+        }
+    )
+
+    return s3_key_summary
@@ -1,7 +1,9 @@
 import os
-from dagster import Definitions, load_assets_from_modules, EnvVar
+from dagster import (AssetSelection, Definitions, EnvVar, define_asset_job,
+                     load_assets_from_modules, multiprocess_executor)
 from . import assets
-from .resources import linked_data_api_resource, duckdb_resource, s3_resource
+from .resources import (linked_data_api_resource, duckdb_resource, s3_resource,
+                        geometry_cache_resource)
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 query_file_path = os.path.join(script_dir, "../queries/all_infras.sparql")
@@ -10,10 +12,28 @@ with open(query_file_path, encoding="utf-8") as qf:
 
 all_assets = load_assets_from_modules([assets])
 
+# Refreshes one or more source systems. Every partition is a separate run, so a backfill
+# over several partitions runs them in parallel, up to the run coordinator's limit.
+source_system_job = define_asset_job(
+    "source_system_job",
+    selection=AssetSelection.assets(assets.raw_infras_data, assets.raw_infras_data_s3,
+                                    assets.all_infras),
+    partitions_def=assets.source_system_partitions,
+)
+
+# Combines the latest output of every partition into the published dataset and summary
+combine_job = define_asset_job(
+    "combine_job",
+    selection=AssetSelection.assets(assets.all_infras_final, assets.infras_summary),
+)
+
 defs = Definitions(
     assets=all_assets,
+    jobs=[source_system_job, combine_job],
+    executor=multiprocess_executor,
     resources={
         "duckdb": duckdb_resource,
+        "geometry_cache": geometry_cache_resource,
         "linked_data_api": linked_data_api_resource.configured({
             "client_id": EnvVar("CLIENT_ID").get_value(),
             "client_secret": EnvVar("CLIENT_SECRET").get_value(),
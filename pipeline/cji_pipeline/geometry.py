@@ -0,0 +1,268 @@
+import re
+import json
+import logging
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from pyproj import Transformer
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def get_lambert72_to_wgs84():
+    """
+    Return the (cached) Lambert72 to WGS84 transformer.
+    """
+    return Transformer.from_crs("EPSG:31370", "EPSG:4326", always_xy=True)
+
+def get_srs_name(gml_string):
+    """
+    Helper function to parse srsName.
+    """
+    match = re.search(r'srsName=["\']([^"\']+)["\']', gml_string)
+    if match:
+        return match.group(1)
+    return None
+
+def get_transformer(srs_name):
+    """
+    Determine CRS based on srsName.
+    """
+    if srs_name:
+        if '31370' in srs_name:
+            return get_lambert72_to_wgs84()
+        elif 'crs84' in srs_name.lower() or '4326' in srs_name:
+            return None  # Already in WGS84
+    return None  # Default to WGS84 if unknown
+
+def parse_geometry(row, log=logger):
+    """
+    Parse the 'point' or 'gml' field of a row.
+
+    Returns a tuple (geometry type, coordinates as an (n, 2) array in the source CRS,
+    transformer to WGS84 or None), or None if the row has no usable geometry.
+    """
+    point_field = row.get('point')
+    gml_field = row.get('gml')
+
+    # Process point data
+    if pd.notnull(point_field):
+        transformer = get_transformer(get_srs_name(point_field))
+
+        # Handle different point formats
+        coord_match = re.search(r'<gml:coordinates>([^<]+)</gml:coordinates>', point_field)
+        if not coord_match:
+            coord_match = re.search(r'<gml:pos>([^<]+)</gml:pos>', point_field)
+        if coord_match:
+            coords_str = coord_match.group(1).strip()
+            # Split on commas or whitespace
+            coords = re.split(r'[,\s]+', coords_str)
+            # Clean up coordinate strings
+            coords = [coord.strip() for coord in coords if coord.strip()]
+            if len(coords) >= 2:
+                try:
+                    return "Point", np.array([coords[:2]], dtype=float), transformer
+                except ValueError as e:
+                    log.error("Error converting coordinates to float for row %s: %s", row.name, e)
+                    return None
+            else:
+                log.error("Insufficient coordinates in point for row %s", row.name)
+                return None
+        return None
+
+    # Process polygon data
+    if pd.notnull(gml_field):
+        transformer = get_transformer(get_srs_name(gml_field))
+
+        pos_list_match = re.search(r'<gml:posList>([^<]+)</gml:posList>', gml_field)
+        if pos_list_match:
+            coord_list = re.split(r'\s+', pos_list_match.group(1).strip())
+            try:
+                coords = np.array(coord_list, dtype=float)
+            except ValueError as e:
+                log.error("Error converting coordinates to float for row %s: %s", row.name, e)
+                return None
+            if len(coords) % 2 != 0:
+                log.error("Invalid number of coordinates in posList for row %s", row.name)
+                return None
+            return "Polygon", coords.reshape(-1, 2), transformer
+
+        log.error("No posList found in gml for row %s", row.name)
+        return None
+
+    return None
+
+def to_geojson(geometry_type, coords):
+    """
+    Serialize WGS84 coordinates as a GeoJSON Point or Polygon geometry string.
+    """
+    if geometry_type == "Point":
+        return json.dumps({"type": "Point", "coordinates": coords[0].tolist()})
+    return json.dumps({"type": "Polygon", "coordinates": [coords.tolist()]})
+
+def create_geojson(row, log=logger):
+    """
+    Convert the 'point' or 'gml' field of a row to a GeoJSON geometry string in WGS84.
+    """
+    parsed = parse_geometry(row, log=log)
+    if parsed is None:
+        return None
+
+    geometry_type, coords, transformer = parsed
+    if transformer:
+        lon, lat = transformer.transform(coords[:, 0], coords[:, 1])
+        coords = np.column_stack([lon, lat])
+    return to_geojson(geometry_type, coords)
+
+# GeoJSON variants of decreasing detail: column -> (Douglas-Peucker tolerance in
+# degrees, number of decimals). 1e-5 degrees is roughly 1 meter in Flanders.
+SIMPLIFICATION_LEVELS = {
+    "geojson_simplified": (0.00001, 6),
+    "geojson_coarse": (0.0001, 5),
+}
+
+DERIVED_GEOMETRY_COLUMNS = ["geojson", "centroid_lon", "centroid_lat", "bbox_min_lon",
+                            "bbox_min_lat", "bbox_max_lon", "bbox_max_lat",
+                            *SIMPLIFICATION_LEVELS]
+
+def simplify_rings(coords, offsets, counts, is_ring, tolerance):
+    """
+    Simplify many rings at once with the Douglas-Peucker algorithm and return a mask
+    of the vertices to keep. coords holds the vertices of all geometries back to back,
+    they start at offsets and have counts vertices; only those flagged in is_ring
+    are simplified.
+
+    Instead of recursing ring by ring, every iteration splits all segments of all rings
+    that still have a vertex farther than tolerance from them, at their farthest
+    vertex. Rings of 4 vertices or fewer and rings that would collapse below a closed
+    triangle are kept unchanged.
+    """
+    num_vertices = len(coords)
+    index = np.arange(num_vertices)
+    keep = np.ones(num_vertices, dtype=bool)
+    simplify = is_ring & (counts > 4)
+    if not simplify.any():
+        return keep
+
+    keep[np.repeat(simplify, counts)] = False
+    keep[offsets[simplify]] = True
+    keep[(offsets + counts - 1)[simplify]] = True
+    # Vertices within tolerance of their segment, which are dropped
+    settled = np.zeros(num_vertices, dtype=bool)
+
+    while True:
+        candidates = np.flatnonzero(~keep & ~settled)
+        if not len(candidates):
+            break
+
+        # The kept vertices before and after each candidate delimit its segment
+        previous = np.maximum.accumulate(np.where(keep, index, 0))[candidates]
+        following = np.minimum.accumulate(
+            np.where(keep, index, num_vertices)[::-1])[::-1][candidates]
+        start, inner = coords[previous], coords[candidates]
+        direction = coords[following] - start
+        length = np.hypot(direction[:, 0], direction[:, 1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            distances = np.where(
+                length == 0,
+                np.hypot(inner[:, 0] - start[:, 0], inner[:, 1] - start[:, 1]),
+                np.abs(direction[:, 0] * (inner[:, 1] - start[:, 1])
+                       - direction[:, 1] * (inner[:, 0] - start[:, 0])) / length)
+
+        # The candidates of a segment are contiguous; split at the first farthest one
+        segment_starts = np.flatnonzero(np.r_[True, previous[1:] != previous[:-1]])
+        segment = np.repeat(np.arange(len(segment_starts)),
+                            np.diff(np.r_[segment_starts, len(candidates)]))
+        farthest_distance = np.maximum.reduceat(distances, segment_starts)
+        is_farthest = np.flatnonzero(distances == farthest_distance[segment])
+        first = is_farthest[np.r_[True, segment[is_farthest][1:] != segment[is_farthest][:-1]]]
+
+        split = farthest_distance > tolerance
+        keep[candidates[first[split[segment[first]]]]] = True
+        settled[candidates[~split[segment]]] = True
+
+    collapsed = simplify & (np.add.reduceat(keep, offsets) < 4)
+    keep[np.repeat(collapsed, counts)] = True
+    return keep
+
+def _centroids(coords, offsets, counts, is_polygon):
+    """
+    Area-weighted centroids of all rings at once, using the shoelace formula
+    relative to each ring's first vertex. Points and degenerate rings fall back
+    to the mean of their vertices.
+    """
+    origins = coords[offsets]
+    local = coords - np.repeat(origins, counts, axis=0)
+
+    following = np.arange(len(coords)) + 1
+    following[offsets + counts - 1] = offsets
+    x0, y0 = local[:, 0], local[:, 1]
+    x1, y1 = local[following, 0], local[following, 1]
+    cross = x0 * y1 - x1 * y0
+
+    area2 = np.add.reduceat(cross, offsets)
+    sum_x = np.add.reduceat((x0 + x1) * cross, offsets)
+    sum_y = np.add.reduceat((y0 + y1) * cross, offsets)
+    means = np.add.reduceat(local, offsets, axis=0) / counts[:, None]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        use_area = is_polygon & (np.abs(area2) > 1e-18)
+        centroid_x = np.where(use_area, sum_x / (3 * area2), means[:, 0])
+        centroid_y = np.where(use_area, sum_y / (3 * area2), means[:, 1])
+    return origins + np.column_stack([centroid_x, centroid_y])
+
+def geometry_columns(parsed):
+    """
+    Build the geojson column plus centroid, bounding box and simplified GeoJSON
+    columns from a Series of parse_geometry() results.
+
+    All vertices are reprojected in a single call per CRS and the centroids and
+    bounding boxes are computed over all geometries at once.
+    """
+    result = pd.DataFrame(index=parsed.index, columns=DERIVED_GEOMETRY_COLUMNS, dtype=object)
+    valid = [(position, value) for position, value in enumerate(parsed) if value is not None]
+    if not valid:
+        return result
+
+    positions = np.array([position for position, _ in valid])
+    geometry_types = [value[0] for _, value in valid]
+    counts = np.array([len(value[1]) for _, value in valid])
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    coords = np.concatenate([value[1] for _, value in valid])
+
+    # Reproject every vertex that shares a transformer in one vectorized call
+    transformers = [value[2] for _, value in valid]
+    for transformer in {id(t): t for t in transformers if t is not None}.values():
+        mask = np.repeat([t is transformer for t in transformers], counts)
+        lon, lat = transformer.transform(coords[mask, 0], coords[mask, 1])
+        coords[mask] = np.column_stack([lon, lat])
+
+    is_polygon = np.array([geometry_type == "Polygon" for geometry_type in geometry_types])
+    centroids = _centroids(coords, offsets, counts, is_polygon)
+    bbox_min = np.minimum.reduceat(coords, offsets, axis=0)
+    bbox_max = np.maximum.reduceat(coords, offsets, axis=0)
+
+    columns = {"geojson": []}
+    for geometry_type, offset, count in zip(geometry_types, offsets, counts):
+        columns["geojson"].append(to_geojson(geometry_type, coords[offset:offset + count]))
+
+    # Simplify the polygons of all rows together, then quantize the kept vertices
+    for column, (tolerance, decimals) in SIMPLIFICATION_LEVELS.items():
+        keep = simplify_rings(coords, offsets, counts, is_polygon, tolerance)
+        kept_coords = np.round(coords[keep], decimals)
+        kept_counts = np.add.reduceat(keep, offsets)
+        kept_offsets = np.concatenate([[0], np.cumsum(kept_counts)[:-1]])
+        columns[column] = [to_geojson(geometry_type, kept_coords[offset:offset + count])
+                           for geometry_type, offset, count
+                           in zip(geometry_types, kept_offsets, kept_counts)]
+
+    for column, values in columns.items():
+        result.iloc[positions, result.columns.get_loc(column)] = values
+    for column, values in (("centroid_lon", centroids[:, 0]), ("centroid_lat", centroids[:, 1]),
+                           ("bbox_min_lon", bbox_min[:, 0]), ("bbox_min_lat", bbox_min[:, 1]),
+                           ("bbox_max_lon", bbox_max[:, 0]), ("bbox_max_lat", bbox_max[:, 1])):
+        result.iloc[positions, result.columns.get_loc(column)] = values
+
+    float_columns = [column for column in DERIVED_GEOMETRY_COLUMNS if column.startswith(
+        ("centroid_", "bbox_"))]
+    return result.astype({column: float for column in float_columns})
@@ -0,0 +1,189 @@
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .geometry import (DERIVED_GEOMETRY_COLUMNS, SIMPLIFICATION_LEVELS, geometry_columns,
+                       parse_geometry)
+
+logger = logging.getLogger(__name__)
+
+# Changes whenever the derived columns would come out differently, which invalidates
+# caches written by earlier versions
+CACHE_VERSION = hashlib.sha256(json.dumps(
+    {"format": 1, "columns": DERIVED_GEOMETRY_COLUMNS, "levels": SIMPLIFICATION_LEVELS},
+    sort_keys=True).encode("utf-8")).hexdigest()[:16]
+VERSION_METADATA_KEY = b"cji_geometry_cache_version"
+# The run the cache was last saved in, so runs that touch no entry still count
+RUN_METADATA_KEY = b"cji_geometry_cache_run"
+
+def geometry_keys(df):
+    """
+    Hash the raw geometry of every row: the 'point' field if present, else the 'gml'
+    field, like parse_geometry. Rows without a geometry get None.
+    """
+    point = df['point'] if 'point' in df else pd.Series(None, index=df.index, dtype=object)
+    gml = df['gml'] if 'gml' in df else pd.Series(None, index=df.index, dtype=object)
+    keys = []
+    for point_field, gml_field in zip(point, gml):
+        if pd.notnull(point_field):
+            raw = "point:" + point_field
+        elif pd.notnull(gml_field):
+            raw = "gml:" + gml_field
+        else:
+            keys.append(None)
+            continue
+        keys.append(hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest())
+    return pd.Series(keys, index=df.index, dtype=object)
+
+class GeometryCache:
+    """
+    Persistent cache of the derived geometry columns, keyed by a hash of the raw
+    'point'/'gml' string, so unchanged geometries skip parsing and reprojection.
+
+    The cache is a single Parquet file on S3 or on local disk, or only kept in memory
+    without either. Every entry records the last run it was used in; entries unseen
+    for max_unseen_runs runs are evicted and the cache never holds more than
+    max_entries entries.
+    """
+    def __init__(self, store=None, s3_key="geometry_cache.parquet", local_path=None,
+                 max_entries=1_000_000, max_unseen_runs=7):
+        self.store = store
+        self.s3_key = s3_key
+        self.local_path = local_path
+        self.max_entries = max_entries
+        self.max_unseen_runs = max_unseen_runs
+        self.run = 1
+        self.stats = {}
+        self._entries = self._empty()
+
+    def partition(self, name):
+        """
+        Return a separate cache for one partition of the data, stored next to this one.
+        """
+        root = os.path.splitext(self.s3_key)[0]
+        local_path = (f"{os.path.splitext(self.local_path)[0]}/{name}.parquet"
+                      if self.local_path else None)
+        return GeometryCache(self.store, s3_key=f"{root}/{name}.parquet", local_path=local_path,
+                             max_entries=self.max_entries, max_unseen_runs=self.max_unseen_runs)
+
+    @staticmethod
+    def _empty():
+        entries = pd.DataFrame(columns=[*DERIVED_GEOMETRY_COLUMNS, "last_seen"])
+        entries.index.name = "key"
+        return entries.astype({"last_seen": "int64"})
+
+    def _read(self):
+        if self.store is not None:
+            if self.store.head(self.s3_key) is None:
+                return None
+            with self.store.download(self.s3_key) as f:
+                return pq.read_table(f)
+        if self.local_path and os.path.exists(self.local_path):
+            return pq.read_table(self.local_path)
+        return None
+
+    def load(self, log=logger):
+        """
+        Load the cache. A missing cache or one written by another CACHE_VERSION
+        starts out empty.
+        """
+        if self.store is None and not self.local_path:
+            # Without a backing store the cache only lives in memory, across loads
+            self.run += 1
+            return len(self._entries)
+
+        table = self._read()
+        metadata = (table.schema.metadata or {}) if table is not None else {}
+        if table is None or metadata.get(VERSION_METADATA_KEY) != CACHE_VERSION.encode("utf-8"):
+            if table is not None:
+                log.info("Discarding geometry cache written by another version")
+            self._entries = self._empty()
+            self.run = 1
+        else:
+            self._entries = table.to_pandas().set_index("key")
+            if RUN_METADATA_KEY in metadata:
+                self.run = int(metadata[RUN_METADATA_KEY]) + 1
+            else:
+                self.run = int(self._entries["last_seen"].max()) + 1 if len(self._entries) else 1
+        return len(self._entries)
+
+    def geometry_columns(self, df, log=logger):
+        """
+        Return the derived geometry columns for df, aligned to its index. Cached rows
+        are copied from the cache; only the others are parsed and reprojected.
+        """
+        keys = geometry_keys(df)
+        has_key = keys.notna().to_numpy()
+        positions = np.full(len(df), -1)
+        if len(self._entries):
+            positions[has_key] = self._entries.index.get_indexer(keys[has_key])
+        hit = positions >= 0
+
+        # Mark the cached entries as seen in this run
+        self._entries.iloc[np.unique(positions[hit]),
+                           self._entries.columns.get_loc("last_seen")] = self.run
+
+        misses = df[~hit]
+        computed = geometry_columns(misses.apply(parse_geometry, axis=1, log=log)
+                                    if len(misses) else pd.Series(dtype=object))
+        cached = self._entries.iloc[positions[hit]][DERIVED_GEOMETRY_COLUMNS]
+        cached.index = df.index[hit]
+        result = pd.concat([cached, computed]).reindex(df.index)
+
+        # Only successfully converted geometries are added to the cache
+        new_keys = keys[~hit]
+        added = computed[computed["geojson"].notna().to_numpy() & new_keys.notna().to_numpy()]
+        added = added.set_axis(new_keys[added.index].to_numpy())
+        added = added[~added.index.duplicated()].assign(last_seen=self.run)
+        added.index.name = "key"
+        if len(added):
+            self._entries = pd.concat([self._entries, added]) if len(self._entries) else added
+
+        self.stats = {"hits": int(hit.sum()), "misses": int((~hit).sum()),
+                      "added": len(added)}
+        return result.astype({column: float for column in DERIVED_GEOMETRY_COLUMNS
+                              if column.startswith(("centroid_", "bbox_"))})
+
+    def evict(self):
+        """
+        Drop entries that have not been seen for max_unseen_runs runs, then the least
+        recently seen entries beyond max_entries. Returns the number of evicted entries.
+        """
+        before = len(self._entries)
+        entries = self._entries[self.run - self._entries["last_seen"] < self.max_unseen_runs]
+        if len(entries) > self.max_entries:
+            entries = entries.sort_values("last_seen", ascending=False,
+                                          kind="stable").head(self.max_entries)
+        self._entries = entries
+        return before - len(entries)
+
+    def save(self):
+        """
+        Evict stale entries and write the cache back. Returns the number of evicted
+        entries.
+        """
+        evicted = self.evict()
+        self.stats["evicted"] = evicted
+        self.stats["entries"] = len(self._entries)
+        if self.store is None and not self.local_path:
+            return evicted
+
+        table = pa.Table.from_pandas(self._entries.reset_index(), preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               VERSION_METADATA_KEY: CACHE_VERSION,
+                                               RUN_METADATA_KEY: str(self.run)})
+
+        if self.store is not None:
+            cache_file = self.store.spooled_file()
+            pq.write_table(table, cache_file)
+            self.store.upload(cache_file, self.s3_key)
+        elif self.local_path:
+            os.makedirs(os.path.dirname(self.local_path) or ".", exist_ok=True)
+            tmp_path = f"{self.local_path}.{os.getpid()}.tmp"
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, self.local_path)
+        return evicted
@@ -0,0 +1,251 @@
+import os
+import time
+import tempfile
+import threading
+import cProfile
+import pstats
+import io
+from contextlib import contextmanager
+from dagster import MetadataValue
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def _current_rss_bytes():
+    """
+    Return the current resident set size of the process in bytes, or None where
+    /proc is not available (e.g. macOS).
+    """
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+class RssSampler:
+    """
+    Sample the resident set size in a background thread, to find the peak RSS
+    while a phase runs. The process-wide high-water mark (ru_maxrss) cannot tell
+    phases apart once the largest one has run.
+    """
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.start_rss = None
+        self.peak_rss = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = _current_rss_bytes()
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+        return rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        """Take the first sample and keep sampling until stop is called."""
+        self.start_rss = self._sample()
+        if self.start_rss is not None:
+            self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling and return the RSS at the end of the phase."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self._sample()
+
+class PhaseStats:
+    """
+    Measurements for a single phase of an asset (e.g. SPARQL fetch or S3 upload).
+    Rows and byte counts can be filled in by the caller while the phase is running.
+    """
+    def __init__(self, name, rows=None, bytes_in=None, bytes_out=None):
+        self.name = name
+        self.rows = rows
+        self.bytes_in = bytes_in
+        self.bytes_out = bytes_out
+        self.wall_time = None
+        self.peak_rss = None
+        self.rss_delta = None
+
+    @property
+    def rows_per_second(self):
+        """Throughput of the phase, if both rows and wall time are known."""
+        if self.rows is None or not self.wall_time:
+            return None
+        return self.rows / self.wall_time
+
+class AssetProfiler:
+    """
+    Timing/profiling layer shared by the CJI assets.
+
+    Every phase records wall time, its peak RSS and RSS growth, bytes in and out and
+    rows per second,
+    which are published as Dagster output metadata so trends show up in the UI.
+    Setting CJI_PROFILE to 'cprofile' or 'pyinstrument' additionally captures a
+    profile of the whole asset and stores it as an artifact in CJI_PROFILE_DIR.
+    """
+    def __init__(self, context, profile_mode=None, profile_dir=None):
+        self.context = context
+        self.phases = []
+        self.profile_mode = (profile_mode if profile_mode is not None
+                             else os.environ.get("CJI_PROFILE", "")).lower()
+        self.profile_dir = profile_dir or os.environ.get(
+            "CJI_PROFILE_DIR",
+            os.path.join(os.environ.get("DAGSTER_HOME", tempfile.gettempdir()), "profiles"),
+        )
+        self.artifact_path = None
+        self.profile_summary = None
+
+    @contextmanager
+    def phase(self, name, rows=None, bytes_in=None, bytes_out=None):
+        """
+        Measure a single phase. Yields the PhaseStats so rows and bytes can be set
+        once they are known.
+        """
+        stats = PhaseStats(name, rows=rows, bytes_in=bytes_in, bytes_out=bytes_out)
+        sampler = RssSampler().start()
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.wall_time = time.perf_counter() - start
+            end_rss = sampler.stop()
+            stats.peak_rss = sampler.peak_rss
+            if end_rss is not None:
+                stats.rss_delta = end_rss - sampler.start_rss
+            self.phases.append(stats)
+            self.context.log.debug(f"Phase '{name}' took {stats.wall_time:.3f}s")
+
+    @contextmanager
+    def capture(self):
+        """
+        Capture a cProfile/pyinstrument profile of the enclosed block if enabled.
+        """
+        if self.profile_mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                self._store_profile(self._store_cprofile, profiler)
+        elif self.profile_mode == "pyinstrument":
+            try:
+                from pyinstrument import Profiler  # pylint: disable=C0415
+            except ImportError:
+                self.context.log.warning("pyinstrument is not installed, skipping profile capture")
+                yield
+                return
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                self._store_profile(self._store_pyinstrument, profiler)
+        else:
+            yield
+
+    def _store_profile(self, store, profiler):
+        """
+        Store a captured profile. A failure is logged rather than raised, so that it
+        does not replace an exception raised by the asset itself.
+        """
+        try:
+            store(profiler)
+        except Exception as e:  # pylint: disable=W0718
+            self.artifact_path = self.profile_summary = None
+            self.context.log.error(f"Failed to store the profile: {e}")
+
+    def _artifact_file(self, extension):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        asset_name = "_".join(self.context.asset_key.path)
+        return os.path.join(self.profile_dir, f"{asset_name}-{self.context.run_id}.{extension}")
+
+    def _store_cprofile(self, profiler):
+        self.artifact_path = self._artifact_file("prof")
+        profiler.dump_stats(self.artifact_path)
+
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(25)
+        self.profile_summary = stream.getvalue()
+        self.context.log.info(f"cProfile stats written to {self.artifact_path}")
+
+    def _store_pyinstrument(self, profiler):
+        self.artifact_path = self._artifact_file("html")
+        with open(self.artifact_path, "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+
+        self.profile_summary = profiler.output_text(unicode=False, color=False)
+        self.context.log.info(f"pyinstrument profile written to {self.artifact_path}")
+
+    def to_metadata(self):
+        """
+        Flatten the recorded phases into Dagster metadata. Numeric entries are kept
+        separate per phase so the Dagster UI can plot them across materializations.
+        """
+        metadata = {}
+        table_rows = ["| phase | wall time (s) | peak RSS (MB) | RSS delta (MB) | bytes in "
+                      "| bytes out | rows/s |",
+                      "|---|---|---|---|---|---|---|"]
+
+        for stats in self.phases:
+            prefix = f"perf_{stats.name}"
+            metadata[f"{prefix}_wall_time_s"] = MetadataValue.float(round(stats.wall_time, 4))
+            if stats.peak_rss is not None:
+                metadata[f"{prefix}_peak_rss_mb"] = MetadataValue.float(
+                    round(stats.peak_rss / (1024 * 1024), 2))
+            if stats.rss_delta is not None:
+                metadata[f"{prefix}_rss_delta_mb"] = MetadataValue.float(
+                    round(stats.rss_delta / (1024 * 1024), 2))
+            if stats.bytes_in is not None:
+                metadata[f"{prefix}_bytes_in"] = MetadataValue.int(int(stats.bytes_in))
+            if stats.bytes_out is not None:
+                metadata[f"{prefix}_bytes_out"] = MetadataValue.int(int(stats.bytes_out))
+            if stats.rows_per_second is not None:
+                metadata[f"{prefix}_rows_per_s"] = MetadataValue.float(
+                    round(stats.rows_per_second, 1))
+
+            table_rows.append(
+                f"| {stats.name} | {stats.wall_time:.3f} | {_format_mb(stats.peak_rss)} "
+                f"| {_format_mb(stats.rss_delta)} "
+                f"| {_format_optional(stats.bytes_in)} | {_format_optional(stats.bytes_out)} "
+                f"| {_format_optional(stats.rows_per_second, '.0f')} |"
+            )
+
+        if self.phases:
+            metadata["perf_total_wall_time_s"] = MetadataValue.float(
+                round(sum(stats.wall_time for stats in self.phases), 4))
+            metadata["perf_phases"] = MetadataValue.md("\n".join(table_rows))
+
+        if self.artifact_path:
+            metadata["profile_artifact"] = MetadataValue.path(self.artifact_path)
+        if self.profile_summary:
+            metadata["profile_summary"] = MetadataValue.md(f"```\n{self.profile_summary}\n```")
+
+        return metadata
+
+def _format_optional(value, fmt="d"):
+    if value is None:
+        return "-"
+    return format(int(value) if fmt == "d" else value, fmt)
+
+def _format_mb(value):
+    if value is None:
+        return "-"
+    return f"{value / (1024 * 1024):.1f}"
+
+def buffer_size(buffer):
+    """Return the number of bytes held by a seekable file object, e.g. a BytesIO buffer."""
+    if isinstance(buffer, io.BytesIO):
+        return buffer.getbuffer().nbytes
+    position = buffer.tell()
+    size = buffer.seek(0, io.SEEK_END)
+    buffer.seek(position)
+    return size
@@ -1,8 +1,178 @@
+import os
+import hashlib
+import shutil
+import tempfile
 from dagster import resource, Field
 from dagster_duckdb import DuckDBResource
 from pandas import DataFrame
 from authlib.integrations.httpx_client import OAuth2Client
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from .geometry_cache import GeometryCache
+
+MB = 1024 * 1024
+
+class S3Store:
+    """
+    Transfer layer on top of a boto3 S3 client.
+
+    Uploads and downloads use a tuned multipart TransferConfig and stream through
+    spooled temporary files. Objects are tagged with their SHA-256 so unchanged
+    content is never uploaded twice, and recently written objects are kept in a
+    local cache so downstream assets can skip the download.
+    Any other attribute is delegated to the underlying boto3 client.
+    """
+    CHECKSUM_METADATA_KEY = "content-sha256"
+
+    def __init__(self, client, bucket_name, transfer_config=None, spool_max_size=64 * MB,
+                 cache_dir=None, cache_max_size=1024 * MB):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.transfer_config = transfer_config or TransferConfig()
+        self.spool_max_size = spool_max_size
+        self.cache_dir = cache_dir
+        self.cache_max_size = cache_max_size
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def spooled_file(self):
+        """
+        Return a temporary file that stays in memory up to spool_max_size and
+        rolls over to disk beyond that.
+        """
+        return tempfile.SpooledTemporaryFile(max_size=self.spool_max_size)
+
+    def _content_digests(self, fileobj):
+        """
+        Compute the SHA-256 of a file object and the ETag S3 would assign to it
+        with the current multipart settings. The file position is reset afterwards.
+        """
+        sha256 = hashlib.sha256()
+        md5 = hashlib.md5()
+        part_digests = []
+        size = 0
+        chunksize = self.transfer_config.multipart_chunksize
+
+        fileobj.seek(0)
+        while True:
+            chunk = fileobj.read(chunksize)
+            if not chunk:
+                break
+            sha256.update(chunk)
+            md5.update(chunk)
+            part_digests.append(hashlib.md5(chunk).digest())
+            size += len(chunk)
+        fileobj.seek(0)
+
+        # Below the threshold the file is uploaded in one part, whatever the chunksize
+        if size < self.transfer_config.multipart_threshold:
+            etag = md5.hexdigest()
+        else:
+            etag = f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+        return sha256.hexdigest(), etag
+
+    def head(self, key):
+        """Return the head_object response for a key, or None if it does not exist."""
+        try:
+            return self.client.head_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def upload(self, fileobj, key):
+        """
+        Upload a file object unless the remote object already has the same content.
+        Returns True if the object was uploaded and False if it was skipped.
+        Note that boto3 may close the file object once the upload is done.
+        """
+        sha256, etag = self._content_digests(fileobj)
+        self._store_in_cache(fileobj, sha256)
+
+        remote = self.head(key)
+        if remote is not None:
+            remote_sha256 = remote.get("Metadata", {}).get(self.CHECKSUM_METADATA_KEY)
+            if remote_sha256 == sha256 or remote.get("ETag", "").strip('"') == etag:
+                return False
+
+        self.client.upload_fileobj(
+            Fileobj=fileobj,
+            Bucket=self.bucket_name,
+            Key=key,
+            ExtraArgs={
+                "Metadata": {self.CHECKSUM_METADATA_KEY: sha256},
+                "ChecksumAlgorithm": "SHA256",
+            },
+            Config=self.transfer_config,
+        )
+        return True
+
+    def download(self, key):
+        """
+        Return a readable file object with the content of the given key. Objects
+        that were recently written through this store are served from the local cache.
+        """
+        remote = self.head(key)
+        if remote is None:
+            raise FileNotFoundError(f"s3://{self.bucket_name}/{key} does not exist")
+
+        cached_path = self._cache_path(remote.get("Metadata", {}).get(self.CHECKSUM_METADATA_KEY))
+        if cached_path and os.path.exists(cached_path):
+            os.utime(cached_path)
+            return open(cached_path, "rb")  # pylint: disable=R1732
+
+        fileobj = self.spooled_file()
+        self.client.download_fileobj(
+            Bucket=self.bucket_name,
+            Key=key,
+            Fileobj=fileobj,
+            Config=self.transfer_config,
+        )
+        fileobj.seek(0)
+        return fileobj
+
+    def _cache_path(self, sha256):
+        if not self.cache_dir or not sha256:
+            return None
+        return os.path.join(self.cache_dir, sha256)
+
+    def _store_in_cache(self, fileobj, sha256):
+        cached_path = self._cache_path(sha256)
+        if cached_path is None:
+            return
+        if not os.path.exists(cached_path):
+            tmp_path = f"{cached_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                shutil.copyfileobj(fileobj, f)
+            os.replace(tmp_path, cached_path)
+            fileobj.seek(0)
+        else:
+            os.utime(cached_path)
+        self._evict_cache()
+
+    def _evict_cache(self):
+        """Remove the least recently used cache entries until the cache fits its size limit."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".tmp") or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.cache_max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
 
 @resource(
     config_schema={
@@ -10,20 +180,75 @@ import boto3
         "aws_secret_access_key": Field(str, is_required=True),
         "region_name": Field(str, is_required=False, default_value="eu-central-1"),
         "s3_bucket_name": Field(str, is_required=True),
+        "endpoint_url": Field(str, is_required=False),
+        "max_concurrency": Field(int, is_required=False, default_value=10),
+        "multipart_threshold_mb": Field(int, is_required=False, default_value=8),
+        "multipart_chunksize_mb": Field(int, is_required=False, default_value=8),
+        "spool_max_size_mb": Field(int, is_required=False, default_value=64),
+        "cache_dir": Field(str, is_required=False),
+        "cache_max_size_mb": Field(int, is_required=False, default_value=1024),
     }
 )
 def s3_resource(context):
     """
     Dagster resource to upload to and download from an S3 bucket.
     """
+    config = context.resource_config
     s3_client = boto3.client(
         "s3",
-        aws_access_key_id=context.resource_config["aws_access_key_id"],
-        aws_secret_access_key=context.resource_config["aws_secret_access_key"],
-        region_name=context.resource_config.get("region_name", "eu-central-1"),
+        aws_access_key_id=config["aws_access_key_id"],
+        aws_secret_access_key=config["aws_secret_access_key"],
+        region_name=config.get("region_name", "eu-central-1"),
+        endpoint_url=config.get("endpoint_url"),
+    )
+    transfer_config = TransferConfig(
+        multipart_threshold=config["multipart_threshold_mb"] * MB,
+        multipart_chunksize=config["multipart_chunksize_mb"] * MB,
+        max_concurrency=config["max_concurrency"],
+        use_threads=True,
+    )
+    cache_dir = config.get("cache_dir") or os.path.join(
+        os.environ.get("DAGSTER_HOME", tempfile.gettempdir()), "s3_cache")
+
+    return S3Store(
+        s3_client,
+        bucket_name=config["s3_bucket_name"],
+        transfer_config=transfer_config,
+        spool_max_size=config["spool_max_size_mb"] * MB,
+        cache_dir=cache_dir,
+        cache_max_size=config["cache_max_size_mb"] * MB,
+    )
+
+@resource(
+    config_schema={
+        "location": Field(str, is_required=False, default_value="s3",
+                          description="Where to keep the cache: 's3', 'local' or 'none'"),
+        "s3_key": Field(str, is_required=False, default_value="geometry_cache.parquet"),
+        "local_path": Field(str, is_required=False),
+        "max_entries": Field(int, is_required=False, default_value=1_000_000),
+        "max_unseen_runs": Field(int, is_required=False, default_value=7),
+    },
+    required_resource_keys={"s3"},
+)
+def geometry_cache_resource(context):
+    """
+    Dagster resource that caches the derived geometry columns across runs.
+    """
+    config = context.resource_config
+    location = config["location"]
+    if location not in ("s3", "local", "none"):
+        raise ValueError(f"Invalid geometry cache location '{location}', "
+                         "must be one of 's3', 'local' or 'none'")
+    local_path = config.get("local_path") or os.path.join(
+        os.environ.get("DAGSTER_HOME", tempfile.gettempdir()), "geometry_cache.parquet")
+
+    return GeometryCache(
+        store=context.resources.s3 if location == "s3" else None,
+        s3_key=config["s3_key"],
+        local_path=local_path if location == "local" else None,
+        max_entries=config["max_entries"],
+        max_unseen_runs=config["max_unseen_runs"],
     )
-    s3_client.bucket_name = context.resource_config["s3_bucket_name"]
-    return s3_client
 
 @resource
 def duckdb_resource():
@@ -48,14 +273,34 @@ class LinkedDataAPI:
 
         self.data_endpoint = data_endpoint
         self.query = query
+        self.last_response_bytes = None
+
+    @staticmethod
+    def filter_namespaces(query, namespaces, exclude=False):
+        """
+        Restrict a query to the given '?namespace' values, or to every other
+        namespace if exclude is True.
+        """
+        values = ", ".join(f'"{namespace}"' for namespace in namespaces)
+        operator = "NOT IN" if exclude else "IN"
+        where_end = query.rindex("}")
+        return (f"{query[:where_end]}    FILTER (STR(?namespace) {operator} ({values}))\n"
+                f"{query[where_end:]}")
 
-    def fetch_data(self):
-        """Fetch data from the Linked Data API."""
-        response = self.client.post(self.data_endpoint, data={'query': self.query}, timeout=None)
+    def fetch_data(self, namespaces=None, exclude=False):
+        """
+        Fetch data from the Linked Data API, optionally for a subset of the namespaces.
+        """
+        query = self.query
+        if namespaces:
+            query = self.filter_namespaces(query, namespaces, exclude=exclude)
+        response = self.client.post(self.data_endpoint, data={'query': query}, timeout=None)
+        self.last_response_bytes = len(response.content)
 
         if response.status_code == 200:
             data = response.json()
-            df = DataFrame(data['results']['bindings'])
+            # Keep every variable as a column, even when no row binds it
+            df = DataFrame(data['results']['bindings'], columns=data['head']['vars'])
             # Process DataFrame to extract the 'value' fields
             return df.applymap(lambda x: x['value'] if isinstance(x, dict) else x)
 
@@ -0,0 +1,109 @@
+import json
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# The pointer object names the current snapshot and lists the retained versions,
+# newest first
+POINTER_KEY = "current.json"
+SNAPSHOT_PREFIX = "snapshots"
+
+def new_version(now=None):
+    """Return a sortable version name for a snapshot created now, e.g. '20261019T053000Z'."""
+    return (now or datetime.now(timezone.utc)).strftime("%Y%m%dT%H%M%SZ")
+
+def snapshot_key(version):
+    """S3 key of the full dataset of a version."""
+    return f"{SNAPSHOT_PREFIX}/{version}/all_infras.parquet"
+
+def delta_key(version):
+    """S3 key of the changes of a version relative to the version before it."""
+    return f"{SNAPSHOT_PREFIX}/{version}/delta.parquet"
+
+def read_pointer(s3_client):
+    """Return the current snapshot pointer, or None if no versioned snapshot exists yet."""
+    if s3_client.head(POINTER_KEY) is None:
+        return None
+    response = s3_client.get_object(Bucket=s3_client.bucket_name, Key=POINTER_KEY)
+    return json.loads(response["Body"].read())
+
+def write_pointer(s3_client, pointer):
+    """Replace the current snapshot pointer."""
+    s3_client.put_object(
+        Bucket=s3_client.bucket_name,
+        Key=POINTER_KEY,
+        Body=json.dumps(pointer, indent=2).encode("utf-8"),
+        ContentType="application/json",
+        CacheControl="no-cache",
+    )
+
+def row_hashes(table):
+    """Hash the content of every row, ignoring the id."""
+    df = table.drop_columns(["id"]).to_pandas()
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+def _occurrences(source_uris, hashes):
+    """
+    Number the rows that share a source_uri, ordered by their content, so the same
+    row gets the same number from one version to the next.
+    """
+    df = pd.DataFrame({"source_uri": source_uris, "row_hash": hashes})
+    ordered = df.sort_values(["source_uri", "row_hash"], kind="stable")
+    occurrences = ordered.groupby("source_uri", sort=False, dropna=False).cumcount()
+    return occurrences.sort_index().to_numpy()
+
+def version_table(table, previous=None):
+    """
+    Give the rows of a new version stable ids and compute its delta.
+
+    Rows are identified by their source_uri and their occurrence among the rows with
+    the same source_uri. Rows that existed in the previous version keep their id, new
+    rows get ids after the highest id so far. Returns the table sorted by id and the
+    delta: the added and changed rows plus the ids of the removed rows, with a 'change'
+    column. The delta is None without a previous version.
+    """
+    hashes = row_hashes(table)
+    source_uris = table.column("source_uri").to_pandas()
+    occurrences = _occurrences(source_uris, hashes)
+
+    if previous is None:
+        ids = np.arange(1, table.num_rows + 1, dtype=np.int64)
+        positions = np.full(table.num_rows, -1)
+    else:
+        previous_ids = previous.column("id").to_numpy().astype(np.int64)
+        previous_hashes = row_hashes(previous)
+        previous_keys = pd.MultiIndex.from_arrays([
+            previous.column("source_uri").to_pandas(),
+            _occurrences(previous.column("source_uri").to_pandas(), previous_hashes)])
+        positions = previous_keys.get_indexer(pd.MultiIndex.from_arrays([source_uris,
+                                                                         occurrences]))
+        ids = np.where(positions >= 0, previous_ids[positions], 0)
+        is_new = positions < 0
+        next_id = int(previous_ids.max()) + 1 if len(previous_ids) else 1
+        ids[is_new] = np.arange(next_id, next_id + is_new.sum(), dtype=np.int64)
+
+    table = table.set_column(table.column_names.index("id"), "id", pa.array(ids))
+    order = np.argsort(ids, kind="stable")
+    table = table.take(order)
+    if previous is None:
+        return table, None
+
+    # Compare the rows that kept their id with their previous content
+    hashes, positions = hashes[order], positions[order]
+    added = positions < 0
+    changed = ~added & (hashes != previous_hashes[np.maximum(positions, 0)])
+    if previous.column_names != table.column_names:
+        changed = ~added
+    removed_ids = np.setdiff1d(previous_ids, ids)
+
+    upserts = table.filter(pa.array(added | changed))
+    upserts = upserts.append_column("change", pa.array(np.where(added, "added", "changed")[
+        added | changed], type=pa.string()))
+    removed = pa.table({field.name: pa.nulls(len(removed_ids), type=field.type)
+                        for field in upserts.schema})
+    removed = removed.set_column(removed.column_names.index("id"), "id",
+                                 pa.array(removed_ids, type=upserts.schema.field("id").type))
+    removed = removed.set_column(removed.column_names.index("change"), "change",
+                                 pa.array(["removed"] * len(removed_ids), type=pa.string()))
+    return table, pa.concat_tables([upserts, removed])
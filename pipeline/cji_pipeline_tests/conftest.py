@@ -0,0 +1,28 @@
+import boto3
+import pytest
+from boto3.s3.transfer import TransferConfig
+from moto import mock_aws
+from cji_pipeline.resources import MB, S3Store
+
+BUCKET_NAME = "cji-test-bucket"
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    """A boto3 S3 client against moto, with an empty bucket."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET_NAME)
+        yield client
+
+@pytest.fixture
+def transfer_config():
+    """Multipart settings small enough to exercise multipart uploads in tests."""
+    return TransferConfig(multipart_threshold=5 * MB, multipart_chunksize=5 * MB)
+
+@pytest.fixture
+def store(s3_client, transfer_config, tmp_path):
+    """An S3Store with a local cache."""
+    return S3Store(s3_client, BUCKET_NAME, transfer_config, cache_dir=str(tmp_path / "cache"))
@@ -1 +1,108 @@
+import io
+import json
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from dagster import build_asset_context
+from cji_pipeline.assets import (INFRAS_SUMMARY_SQL, OTHER_SOURCE_SYSTEM, SOURCE_SYSTEM_MAPPING,
+                                 all_infras_final, source_system_namespaces,
+                                 source_system_slug)
+from cji_pipeline.resources import LinkedDataAPI
+from cji_pipeline.snapshots import POINTER_KEY
 
+QUERY = """SELECT ?subject ?namespace WHERE {
+    ?subject <http://example.org/namespace> ?namespace .
+}
+"""
+
+@pytest.mark.parametrize("exclude, operator", [(False, "IN"), (True, "NOT IN")])
+def test_filter_namespaces(exclude, operator):
+    query = LinkedDataAPI.filter_namespaces(QUERY, ["https://a/", "https://b/"], exclude)
+    assert query == ("SELECT ?subject ?namespace WHERE {\n"
+                     "    ?subject <http://example.org/namespace> ?namespace .\n"
+                     f'    FILTER (STR(?namespace) {operator} ("https://a/", "https://b/"))\n'
+                     "}\n")
+
+def test_other_partition_excludes_the_mapped_namespaces():
+    namespaces, exclude = source_system_namespaces(OTHER_SOURCE_SYSTEM)
+    assert exclude and set(namespaces) == set(SOURCE_SYSTEM_MAPPING)
+    assert " NOT IN (" in LinkedDataAPI.filter_namespaces(QUERY, namespaces, exclude)
+
+    namespaces, exclude = source_system_namespaces("Jeugdmaps")
+    assert not exclude and len(namespaces) == 2
+    assert " IN (" in LinkedDataAPI.filter_namespaces(QUERY, namespaces, exclude)
+
+@pytest.mark.parametrize("source_system, slug", [
+    ("Kampas", "kampas"),
+    ("Natuur en bos", "natuur-en-bos"),
+    ("UiTdatabank", "uitdatabank"),
+    (" Other / système ", "other-syst-me"),
+])
+def test_source_system_slug(source_system, slug):
+    assert source_system_slug(source_system) == slug
+
+def _partition(store, source_system, num_rows):
+    """Upload an all_infras partition, with ids that are only unique within it."""
+    table = pa.table({
+        "id": pa.array(range(1, num_rows + 1), type=pa.int64()),
+        "source_uri": [f"https://{source_system_slug(source_system)}/{i}"
+                       for i in range(num_rows)],
+        "source_system": [source_system] * num_rows,
+    })
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    buffer.seek(0)
+    s3_key = f"all_infras/{source_system_slug(source_system)}.parquet"
+    store.upload(buffer, s3_key)
+    return s3_key
+
+def test_all_infras_final_combines_the_partitions(store):
+    partitions = {"Kampas": 3, "Terra": 2, OTHER_SOURCE_SYSTEM: 0}
+    all_infras = {source_system: _partition(store, source_system, num_rows)
+                  for source_system, num_rows in partitions.items()}
+
+    s3_key = all_infras_final(build_asset_context(resources={"s3": store}), all_infras)
+
+    with store.download(s3_key) as parquet_file:
+        table = pq.read_table(parquet_file)
+    assert table.column("id").to_pylist() == [1, 2, 3, 4, 5]
+    assert table.column("source_system").to_pylist().count("Kampas") == 3
+    assert table.column("source_system").to_pylist().count("Terra") == 2
+
+    pointer = json.loads(store.get_object(Bucket=store.bucket_name,
+                                          Key=POINTER_KEY)["Body"].read())
+    assert pointer["key"] == s3_key
+    assert pointer["num_records"] == 5
+    assert pointer["delta_key"] is None
+
+def test_infras_summary_sql():
+    point, polygon = "<gml:Point/>", "<gml:Polygon/>"
+    table = pa.table({
+        "source_system": ["Kampas", "Kampas", "Kampas", "Terra", None],
+        "location_type_label": ["Sporthal"] * 5,
+        "city": ["Gent", "Gent", "Gent", "Gent", None],
+        "postal_code": ["9000", "9000", "9000", "9000", None],
+        "location_name": ["A", None, "C", "D", "E"],
+        "street": ["Straat", "Straat", None, None, None],
+        "house_number": ["1"] * 5,
+        "adresregister_uri": [None] * 5,
+        "perceel_uri": ["p"] * 5,
+        "geojson": ["{}", "{}", None, "{}", None],
+        "point": [point, None, None, point, None],
+        "gml": [None, polygon, None, None, None],
+    })
+    conn = duckdb.connect()
+    conn.register("all_infras", table)
+    rows = conn.execute(INFRAS_SUMMARY_SQL).fetch_arrow_table().to_pylist()
+
+    assert [(row["source_system"], row["city"], row["num_records"]) for row in rows] == [
+        ("Kampas", "Gent", 3), ("Terra", "Gent", 1), (None, None, 1)]
+    kampas, _, unknown = rows
+    assert (kampas["num_with_geometry"], kampas["num_with_point"],
+            kampas["num_with_polygon"]) == (2, 1, 1)
+    assert (kampas["null_location_name"], kampas["null_street"], kampas["null_house_number"],
+            kampas["null_adresregister_uri"]) == (1, 1, 0, 3)
+    assert unknown["postal_code"] is None
+    assert (unknown["num_with_geometry"], unknown["null_city"], unknown["null_postal_code"]) == (
+        0, 1, 1)
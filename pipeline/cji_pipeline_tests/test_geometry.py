@@ -0,0 +1,26 @@
+import numpy as np
+from cji_pipeline.geometry import simplify_rings
+
+def _rings(*rings):
+    counts = np.array([len(ring) for ring in rings])
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    return np.concatenate([np.array(ring, dtype=float) for ring in rings]), offsets, counts
+
+def test_simplify_rings_drops_vertices_within_tolerance():
+    # A square with a nearly collinear vertex on every side, next to a point
+    square = [(0, 0), (0.5, 0.00001), (1, 0), (1, 0.5), (1, 1), (0.5, 1), (0, 1), (0, 0.5), (0, 0)]
+    coords, offsets, counts = _rings(square, [(5, 5)])
+
+    keep = simplify_rings(coords, offsets, counts, np.array([True, False]), 0.001)
+    assert coords[keep].tolist() == [[0, 0], [1, 0], [1, 1], [0, 1], [0, 0], [5, 5]]
+
+    keep = simplify_rings(coords, offsets, counts, np.array([True, False]), 0.000001)
+    assert coords[keep].tolist()[1] == [0.5, 0.00001]
+
+def test_simplify_rings_keeps_rings_that_would_collapse():
+    sliver = [(0, 0), (0.5, 0.0001), (1, 0), (0.5, -0.0001), (0, 0)]
+    small = [(0, 0), (1, 0), (1, 1), (0, 0)]
+    coords, offsets, counts = _rings(sliver, small)
+
+    keep = simplify_rings(coords, offsets, counts, np.array([True, True]), 0.01)
+    assert keep.all()
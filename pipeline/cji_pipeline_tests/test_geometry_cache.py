@@ -0,0 +1,73 @@
+import pandas as pd
+import pyarrow.parquet as pq
+from cji_pipeline.geometry_cache import RUN_METADATA_KEY, GeometryCache
+
+def _bindings(*lons):
+    return pd.DataFrame({"point": [f"<gml:Point><gml:pos>{lon} 51.2</gml:pos></gml:Point>"
+                                   for lon in lons]})
+
+def _run(cache, df):
+    cache.load()
+    columns = cache.geometry_columns(df)
+    cache.save()
+    return columns
+
+def test_cached_geometries_are_not_recomputed(tmp_path):
+    df = _bindings(4.1, 4.2, 4.3)
+    first = _run(GeometryCache(local_path=str(tmp_path / "cache.parquet")), df)
+
+    cache = GeometryCache(local_path=str(tmp_path / "cache.parquet"))
+    second = _run(cache, _bindings(4.1, 4.2, 4.4))
+    assert cache.stats == {"hits": 2, "misses": 1, "added": 1, "evicted": 0, "entries": 4}
+    pd.testing.assert_frame_equal(first.iloc[:2], second.iloc[:2])
+    assert second["centroid_lon"].tolist() == [4.1, 4.2, 4.4]
+
+def test_in_memory_cache_is_kept_across_loads():
+    cache = GeometryCache()
+    _run(cache, _bindings(4.1, 4.2))
+    _run(cache, _bindings(4.1, 4.2))
+    assert cache.stats["hits"] == 2
+
+def test_runs_without_the_entry_still_count_towards_eviction(tmp_path):
+    path = str(tmp_path / "cache.parquet")
+    cache = GeometryCache(local_path=path, max_unseen_runs=3)
+    _run(cache, _bindings(4.1))
+
+    # Runs that hit no cached entry must still advance the run counter
+    for run in range(2, 4):
+        _run(cache, _bindings())
+        assert cache.run == run
+        assert pq.read_schema(path).metadata[RUN_METADATA_KEY] == str(run).encode()
+        assert cache.stats["entries"] == 1
+
+    _run(cache, _bindings())
+    assert cache.stats["evicted"] == 1
+    assert cache.stats["entries"] == 0
+
+def test_cache_keeps_at_most_max_entries(tmp_path):
+    cache = GeometryCache(local_path=str(tmp_path / "cache.parquet"), max_entries=2)
+    _run(cache, _bindings(4.1))
+    _run(cache, _bindings(4.2, 4.3))
+    assert cache.stats["evicted"] == 1
+
+    cache.load()
+    cache.geometry_columns(_bindings(4.1, 4.2, 4.3))
+    assert cache.stats["hits"] == 2
+    assert cache.stats["misses"] == 1
+
+def test_cache_on_s3(store):
+    cache = GeometryCache(store=store, s3_key="geometry_cache.parquet")
+    _run(cache, _bindings(4.1, 4.2))
+
+    cache = GeometryCache(store=store, s3_key="geometry_cache.parquet")
+    _run(cache, _bindings(4.1, 4.2))
+    assert cache.run == 2
+    assert cache.stats["hits"] == 2
+
+def test_partition_is_stored_next_to_the_cache(tmp_path):
+    cache = GeometryCache(s3_key="cache/geometry.parquet",
+                          local_path=str(tmp_path / "geometry.parquet"), max_entries=5)
+    partition = cache.partition("natuur-en-bos")
+    assert partition.s3_key == "cache/geometry/natuur-en-bos.parquet"
+    assert partition.local_path == str(tmp_path / "geometry" / "natuur-en-bos.parquet")
+    assert partition.max_entries == 5
@@ -0,0 +1,103 @@
+import io
+import os
+import tempfile
+from types import SimpleNamespace
+import pytest
+from cji_pipeline import profiling
+from cji_pipeline.profiling import AssetProfiler, RssSampler, buffer_size
+
+class StubLog:
+    """Records the messages logged through a Dagster context."""
+    def __init__(self):
+        self.messages = []
+
+    def __getattr__(self, level):
+        return lambda message: self.messages.append((level, message))
+
+def _context():
+    return SimpleNamespace(log=StubLog(), asset_key=SimpleNamespace(path=["cji", "all_infras"]),
+                           run_id="run-1")
+
+def test_phases_are_published_as_metadata():
+    profiler = AssetProfiler(_context(), profile_mode="")
+    with profiler.phase("sparql_fetch", bytes_in=2048) as phase:
+        phase.rows = 100
+    with profiler.phase("s3_upload", bytes_out=1024):
+        pass
+
+    metadata = profiler.to_metadata()
+    assert metadata["perf_sparql_fetch_bytes_in"].value == 2048
+    assert metadata["perf_sparql_fetch_rows_per_s"].value > 0
+    assert metadata["perf_s3_upload_bytes_out"].value == 1024
+    assert "perf_s3_upload_rows_per_s" not in metadata
+    assert metadata["perf_total_wall_time_s"].value == pytest.approx(
+        sum(stats.wall_time for stats in profiler.phases), abs=1e-3)
+
+    table = metadata["perf_phases"].value.splitlines()
+    assert len(table) == 4
+    assert table[2].startswith("| sparql_fetch |")
+    assert table[3].startswith("| s3_upload |") and table[3].endswith("| 1024 | - |")
+    assert "profile_artifact" not in metadata
+
+def test_phase_is_recorded_when_it_fails():
+    profiler = AssetProfiler(_context(), profile_mode="")
+    with pytest.raises(ValueError):
+        with profiler.phase("combine"):
+            raise ValueError("broken")
+    assert [stats.name for stats in profiler.phases] == ["combine"]
+    assert profiler.phases[0].wall_time is not None
+
+def test_no_metadata_without_phases():
+    assert not AssetProfiler(_context(), profile_mode="").to_metadata()
+
+def test_cprofile_capture_writes_an_artifact(tmp_path):
+    profiler = AssetProfiler(_context(), profile_mode="cprofile", profile_dir=str(tmp_path))
+    with profiler.capture():
+        sorted(range(1000), key=lambda value: -value)
+
+    assert profiler.artifact_path == str(tmp_path / "cji_all_infras-run-1.prof")
+    assert os.path.getsize(profiler.artifact_path) > 0
+    metadata = profiler.to_metadata()
+    assert metadata["profile_artifact"].value == profiler.artifact_path
+    assert "cumulative" in metadata["profile_summary"].value
+
+def test_failing_to_store_the_profile_keeps_the_asset_error(tmp_path):
+    context = _context()
+    profile_dir = tmp_path / "profiles"
+    profile_dir.write_text("not a directory")
+    profiler = AssetProfiler(context, profile_mode="cprofile", profile_dir=str(profile_dir))
+
+    with pytest.raises(ValueError, match="asset failed"):
+        with profiler.capture():
+            raise ValueError("asset failed")
+    assert [level for level, _ in context.log.messages] == ["error"]
+    assert "profile_artifact" not in profiler.to_metadata()
+
+    # Without an error in the asset, the failure is logged as well
+    with profiler.capture():
+        pass
+    assert len(context.log.messages) == 2
+
+def test_rss_sampler_tracks_the_peak(monkeypatch):
+    samples = iter([100, 300, 200])
+    monkeypatch.setattr(profiling, "_current_rss_bytes", lambda: next(samples, 200))
+    sampler = RssSampler(interval=60).start()
+    assert sampler.start_rss == 100
+    sampler._sample()  # pylint: disable=W0212
+    assert sampler.stop() == 200
+    assert sampler.peak_rss == 300
+
+def test_rss_sampler_without_proc(monkeypatch):
+    monkeypatch.setattr(profiling, "_current_rss_bytes", lambda: None)
+    sampler = RssSampler().start()
+    assert sampler.stop() is None
+    assert sampler.peak_rss is None
+
+def test_buffer_size():
+    assert buffer_size(io.BytesIO(b"x" * 10)) == 10
+
+    with tempfile.SpooledTemporaryFile(max_size=4) as spooled:
+        spooled.write(b"x" * 10)
+        spooled.seek(3)
+        assert buffer_size(spooled) == 10
+        assert spooled.tell() == 3
@@ -0,0 +1,72 @@
+import io
+import os
+import pytest
+from boto3.s3.transfer import TransferConfig
+from cji_pipeline.resources import MB, S3Store
+from .conftest import BUCKET_NAME
+
+def _file(content):
+    return io.BytesIO(content)
+
+def test_upload_skips_unchanged_content(store):
+    assert store.upload(_file(b"a" * 100), "data.parquet") is True
+    assert store.upload(_file(b"a" * 100), "data.parquet") is False
+    assert store.upload(_file(b"b" * 100), "data.parquet") is True
+
+    remote = store.head("data.parquet")
+    assert remote["Metadata"][S3Store.CHECKSUM_METADATA_KEY] == store._content_digests(
+        _file(b"b" * 100))[0]
+
+def test_multipart_etag_matches_s3(s3_client, store, transfer_config):
+    # 11 MB in 5 MB parts: three parts, so S3 assigns a multipart ETag
+    content = os.urandom(11 * MB)
+    s3_client.upload_fileobj(_file(content), BUCKET_NAME, "large.bin", Config=transfer_config)
+
+    _, etag = store._content_digests(_file(content))
+    assert etag.endswith("-3")
+    assert store.head("large.bin")["ETag"].strip('"') == etag
+
+    # The object has no checksum metadata, so only the ETag can tell it is unchanged
+    assert store.upload(_file(content), "large.bin") is False
+
+def test_single_part_etag_matches_s3(s3_client, store):
+    s3_client.put_object(Bucket=BUCKET_NAME, Key="small.bin", Body=b"small")
+    assert store.upload(_file(b"small"), "small.bin") is False
+
+def test_single_part_etag_with_a_smaller_chunksize(s3_client, tmp_path):
+    # A 6 MB file is uploaded in one part, even though it spans two 5 MB chunks
+    transfer_config = TransferConfig(multipart_threshold=8 * MB, multipart_chunksize=5 * MB)
+    store = S3Store(s3_client, BUCKET_NAME, transfer_config, cache_dir=str(tmp_path / "cache"))
+    content = os.urandom(6 * MB)
+    s3_client.put_object(Bucket=BUCKET_NAME, Key="medium.bin", Body=content)
+
+    _, etag = store._content_digests(_file(content))
+    assert store.head("medium.bin")["ETag"].strip('"') == etag
+    assert store.upload(_file(content), "medium.bin") is False
+
+def test_download_is_served_from_cache(s3_client, store, transfer_config, tmp_path):
+    store.upload(_file(b"cached content"), "data.parquet")
+
+    with store.download("data.parquet") as f:
+        assert os.path.dirname(f.name) == store.cache_dir
+        assert f.read() == b"cached content"
+
+    # A store without the cached copy downloads the object
+    other = S3Store(s3_client, BUCKET_NAME, transfer_config, cache_dir=str(tmp_path / "other"))
+    with other.download("data.parquet") as f:
+        assert f.read() == b"cached content"
+
+def test_download_missing_key(store):
+    with pytest.raises(FileNotFoundError):
+        store.download("missing.parquet")
+
+def test_cache_evicts_least_recently_used(s3_client, transfer_config, tmp_path):
+    store = S3Store(s3_client, BUCKET_NAME, transfer_config, cache_dir=str(tmp_path / "cache"),
+                    cache_max_size=250)
+    for name in ("a", "b", "c"):
+        store.upload(_file(name.encode() * 100), f"{name}.bin")
+
+    cached = sorted(os.listdir(store.cache_dir))
+    assert len(cached) == 2
+    assert store._cache_path(store._content_digests(_file(b"a" * 100))[0]) not in [
+        os.path.join(store.cache_dir, name) for name in cached]